@@ -2,18 +2,22 @@
 
 import os
 import re
+import zlib
 from datetime import datetime
 
-from flask import Flask, request, render_template, jsonify, url_for, redirect
+from flask import Flask, request, render_template, jsonify, url_for, redirect, send_file
 
-from config import SPEAKERS, LANGUAGES
-from tts_service import start_job, generate_full_audio, REGISTRY
+from config import SPEAKERS, LANGUAGES, AUDIO_CACHE_MAX_AGE, AUDIO_SENDFILE, AUDIO_ACCEL_PREFIX, MAX_BULK_DOCUMENTS
+from tts_service import start_job, start_jobs, resolve_priority, retry_job, cleanup_interrupted, edit_conversion_text, generate_full_audio, get_conversion_peaks, export_audiobook, retitle_audiobook, audiobook_filename, get_completion_estimates, live_estimated_duration, REGISTRY
+from rate_model import RATE_MODEL
 import db
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
+app.use_x_sendfile = AUDIO_SENDFILE == "x-sendfile"
 
 # Initialize DB
 db.init_db()
+cleanup_interrupted(app.static_folder)
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -77,6 +81,7 @@ def conversion(conversion_id):
         title=data["title"],
         provider=data.get("provider", "local"),
         last_played_index=data["last_played_index"],
+        seek_index=request.args.get("seek", type=int),
         providers=REGISTRY.list_providers()
     )
 
@@ -85,7 +90,17 @@ def status(conversion_id):
     data = db.get_conversion_with_chunks(conversion_id)
     if not data:
         return jsonify({"error": "Unknown job ID"}), 404
+    return jsonify(build_status(data))
 
+def chunk_audio_url_prefix(conversion_id: str) -> str:
+    # Built from the URL map directly so it also works outside a Flask request (asgi.py).
+    # Chunk URLs only differ in the trailing id, so /status builds this once and
+    # appends the ids instead of routing thousands of URLs on every poll.
+    return app.url_map.bind("").build("chunk_audio", {"conversion_id": conversion_id, "chunk_id": 0})[:-1]
+
+def build_status(data: dict) -> dict:
+    """Payload of /status for a conversion as returned by get_conversion_with_chunks."""
+    conversion_id = data["id"]
     chunks = data["chunks"]
     total = len(chunks)
     
@@ -104,9 +119,10 @@ def status(conversion_id):
     
     chunk_urls_map = {}
     chunk_durations_map = {}
+    url_prefix = chunk_audio_url_prefix(conversion_id)
     for c in chunks:
         if c["status"] == "done" and c["audio_filename"]:
-            chunk_urls_map[c["seq_num"]] = url_for("static", filename=c["audio_filename"])
+            chunk_urls_map[c["seq_num"]] = f"{url_prefix}{c['id']}"
             chunk_durations_map[c["seq_num"]] = c.get("duration", 0.0)
             
     # Convert map to list if frontend expects list (it does `data.chunk_urls.forEach((url, idx)`)
@@ -119,6 +135,13 @@ def status(conversion_id):
             url_list[seq] = url
             duration_list[seq] = chunk_durations_map[seq]
             
+    # Live estimate, the same one the waveform's gaps are sized from
+    estimated_duration = live_estimated_duration(data)
+
+    # What silence trimming removed from the finished chunks
+    seconds_saved = sum(c.get("trimmed_seconds") or 0.0 for c in chunks)
+    bytes_saved = sum(c.get("saved_bytes") or 0 for c in chunks)
+
     # Check full audio
     audio_url = None
     # If we had a specific field for full audio in DB, we'd use it. 
@@ -126,33 +149,205 @@ def status(conversion_id):
     # We can check if `full_{id}.wav` exists or generate it on demand.
     # For now, client calls `/generate_full`.
     
-    return jsonify({
+    return {
         "status": data["status"],
         "total": total,
         "done": done_count,
         "progress": progress,
         "chunk_urls": url_list,
         "chunk_durations": duration_list,
-        "estimated_duration": data.get("estimated_duration", 0.0),
+        "estimated_duration": estimated_duration,
         "total_duration": data.get("total_duration", 0.0),
+        "seconds_saved": round(seconds_saved, 2),
+        "export": {
+            "status": data.get("export_status"),
+            "progress": data.get("export_progress") or 0.0,
+            "url": app.url_map.bind("").build("audiobook_audio", {"conversion_id": conversion_id})
+            if data.get("export_status") == "ready" else None,
+        },
+        "bytes_saved": bytes_saved,
         "provider": data.get("provider", "local"),
         "speaker": data.get("speaker"),
         "language": data.get("language")
         # "saved_filename": ... 
-    })
+    }
+
+def _send_audio(rel_path: str, immutable: bool, download_name: str = None, mimetype: str = "audio/wav"):
+    """
+    Serve a file below the static folder with Range support and a strong ETag.
+    Immutable files get a long-lived Cache-Control; the rest are revalidated.
+    """
+    abs_path = os.path.join(app.static_folder, rel_path)
+    if not os.path.isfile(abs_path):
+        return jsonify({"error": "Audio not found"}), 404
+
+    st = os.stat(abs_path)
+    etag = f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+    if AUDIO_SENDFILE == "x-accel-redirect":
+        # nginx serves the body and handles Range itself
+        response = app.response_class(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = AUDIO_ACCEL_PREFIX + rel_path.replace(os.sep, "/")
+        response.set_etag(etag)
+        response.make_conditional(request)
+    else:
+        response = send_file(
+            abs_path,
+            mimetype=mimetype,
+            conditional=True,
+            etag=etag,
+            download_name=download_name,
+        )
+
+    if immutable:
+        response.headers["Cache-Control"] = f"public, max-age={AUDIO_CACHE_MAX_AGE}, immutable"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route("/audio/<conversion_id>/chunk/<int:chunk_id>", methods=["GET"])
+def chunk_audio(conversion_id, chunk_id):
+    # A chunk row's audio never changes once done: edits replace the row
+    chunk = db.get_chunk_by_id(chunk_id)
+    if not chunk or chunk["conversion_id"] != conversion_id or chunk["status"] != "done" or not chunk["audio_filename"]:
+        return jsonify({"error": "Audio not found"}), 404
+    return _send_audio(chunk["audio_filename"], immutable=True)
+
+@app.route("/audio/<conversion_id>/full", methods=["GET"])
+def full_audio(conversion_id):
+    # Same URL is regenerated after edits, so it is revalidated rather than immutable
+    try:
+        rel_path = generate_full_audio(conversion_id, app.static_folder)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    return _send_audio(rel_path, immutable=False, download_name=os.path.basename(rel_path))
+
+@app.route("/api/peaks/<conversion_id>", methods=["GET"])
+def conversion_peaks(conversion_id):
+    """
+    Waveform of the finished audio as raw int8 (min, max) pairs, scaled to +-127.
+    ?width=N reduces it to at most N pairs for drawing.
+    """
+    width = request.args.get("width", default=0, type=int)
+    result = get_conversion_peaks(conversion_id, app.static_folder, width=max(0, width))
+    if result is None:
+        return jsonify({"error": "Conversion not found"}), 404
+
+    values, pairs_per_second = result
+    body = values.tobytes()
+    response = app.response_class(body, mimetype="application/octet-stream")
+    response.headers["X-Peaks-Count"] = str(len(values) // 2)
+    response.headers["X-Peaks-Per-Second"] = f"{pairs_per_second:.6g}"
+    response.headers["Cache-Control"] = "no-cache"
+    response.set_etag(f"{zlib.crc32(body):08x}-{len(body):x}-{width}")
+    return response.make_conditional(request)
+
+@app.route("/audio/<conversion_id>/audiobook", methods=["GET"])
+def audiobook_audio(conversion_id):
+    data = db.get_conversion(conversion_id)
+    if not data or data.get("export_status") != "ready":
+        return jsonify({"error": "Audiobook not ready"}), 404
+    # Retitling rewrites the file in place, so it is revalidated rather than immutable
+    return _send_audio(
+        f"jobs/{conversion_id}/audiobook.m4b",
+        immutable=False,
+        download_name=audiobook_filename(data),
+        mimetype="audio/mp4",
+    )
+
+@app.route("/api/export/<conversion_id>", methods=["POST"])
+def start_export(conversion_id):
+    if not db.get_conversion(conversion_id):
+        return jsonify({"error": "Conversion not found"}), 404
+    if not export_audiobook(conversion_id, app.static_folder):
+        return jsonify({"error": "Audiobook export needs ffmpeg"}), 503
+    return jsonify({"status": "ok"})
 
 @app.route("/generate_full/<conversion_id>", methods=["POST"])
 def generate_full(conversion_id):
     try:
         static_folder = app.static_folder
-        rel_path = generate_full_audio(conversion_id, static_folder)
+        generate_full_audio(conversion_id, static_folder)
         return jsonify({
             "status": "ok",
-            "audio_url": url_for("static", filename=rel_path)
+            "audio_url": url_for("full_audio", conversion_id=conversion_id)
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/bulk", methods=["POST"])
+def bulk_submit():
+    """
+    Create many conversions at once.
+    JSON: {"documents": [{"title", "text"}, ...], "provider", "speaker", "language", "use_cuda", "priority"}
+    or multipart/form-data with one or more "files" (UTF-8 text, title from the file name) and the same fields.
+    """
+    if request.files:
+        options = request.form
+        documents = []
+        for f in request.files.getlist("files"):
+            try:
+                text = f.read().decode("utf-8-sig")
+            except UnicodeDecodeError:
+                return jsonify({"error": f"{f.filename} is not UTF-8 text"}), 400
+            documents.append({"title": os.path.splitext(os.path.basename(f.filename or ""))[0], "text": text})
+        use_cuda = options.get("use_cuda", "on") in ("on", "true", "1")
+    else:
+        options = request.json or {}
+        documents = options.get("documents") or []
+        use_cuda = bool(options.get("use_cuda", True))
+
+    documents = [d for d in documents if isinstance(d, dict) and (d.get("text") or "").strip()]
+    if not documents:
+        return jsonify({"error": "No documents with text"}), 400
+    if len(documents) > MAX_BULK_DOCUMENTS:
+        return jsonify({"error": f"At most {MAX_BULK_DOCUMENTS} documents per request"}), 400
+
+    try:
+        priority = resolve_priority(options.get("priority"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    provider = options.get("provider", "local")
+    if not REGISTRY.get_provider(provider):
+        return jsonify({"error": "Provider not found"}), 404
+
+    conversion_ids = start_jobs(
+        documents,
+        speaker=options.get("speaker", SPEAKERS[0]),
+        language=options.get("language", "en"),
+        provider=provider,
+        use_cuda=use_cuda,
+        static_folder=app.static_folder,
+        priority=priority,
+    )
+    return jsonify({"status": "ok", "count": len(conversion_ids), "conversion_ids": conversion_ids})
+
+@app.route("/api/retry", methods=["POST"])
+def retry_conversion():
+    data = request.json
+    conversion_id = data.get("conversion_id")
+    if not conversion_id:
+        return jsonify({"error": "Missing data"}), 400
+    try:
+        queued = retry_job(conversion_id, static_folder=app.static_folder, use_cuda=data.get("use_cuda"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    return jsonify({"status": "ok", "queued": queued})
+
+@app.route("/api/edit", methods=["POST"])
+def edit_conversion():
+    data = request.json
+    conversion_id = data.get("conversion_id")
+    text = data.get("text")
+    if not conversion_id or text is None:
+        return jsonify({"error": "Missing data"}), 400
+    try:
+        result = edit_conversion_text(conversion_id, text, static_folder=app.static_folder, use_cuda=data.get("use_cuda"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"status": "ok", **result})
+
 @app.route("/api/progress", methods=["POST"])
 def update_progress():
     data = request.json
@@ -170,16 +365,21 @@ def rename_conversion():
     new_title = data.get("title")
     if conversion_id and new_title:
         db.update_conversion_title(conversion_id, new_title)
+        retitle_audiobook(conversion_id, app.static_folder)
         return jsonify({"status": "ok"})
     return jsonify({"error": "Missing data"}), 400
 
 @app.route("/api/jobs/status", methods=["GET"])
 def get_jobs_status():
-    conversions = db.get_all_conversions()
+    return jsonify(build_jobs_status(db.get_all_conversions()))
+
+def build_jobs_status(conversions: list[dict], remaining_chars: dict = None) -> dict:
+    """Payload of /api/jobs/status; remaining_chars as from db.get_remaining_chars."""
     # Filter for active jobs only (queued, processing, converting)
     # Status strings used in UI: queued, processing, done. 
     # 'converting' was a class name but status might be 'processing'.
     active_jobs = []
+    etas = get_completion_estimates(conversions, remaining_chars)
     
     for c in conversions:
         # Include all jobs or just active?
@@ -214,10 +414,23 @@ def get_jobs_status():
             "last_played_index": c.get("last_played_index", -1),
             "total_duration": c.get("total_duration", 0.0),
             "estimated_duration": c.get("estimated_duration", 0.0),
+            "eta_seconds": round(etas.get(c["id"], 0.0), 1),
             "provider": c.get("provider", "local")
         })
             
-    return jsonify({"jobs": active_jobs})
+    return {"jobs": active_jobs}
+
+@app.route("/api/search", methods=["GET"])
+def search():
+    query = request.args.get("q", "")
+    limit = request.args.get("limit", 20, type=int)
+    results = db.search(query, limit=max(1, min(limit, 100)))
+    for conv in results:
+        for m in conv["matches"]:
+            m["audio_url"] = url_for("chunk_audio", conversion_id=conv["id"], chunk_id=m["id"]) if m["status"] == "done" else None
+            m["url"] = url_for("conversion", conversion_id=conv["id"], seek=m["seq_num"])
+        conv["url"] = url_for("conversion", conversion_id=conv["id"])
+    return jsonify({"query": query, "results": results})
 
 @app.route("/api/providers", methods=["GET"])
 def get_providers():
@@ -238,6 +451,27 @@ def get_provider_languages(provider_id):
         return jsonify({"languages": provider.get_languages()})
     return jsonify({"error": "Provider not found"}), 404
 
+@app.route("/api/providers/<provider_id>/models", methods=["GET"])
+def get_provider_models(provider_id):
+    provider = REGISTRY.get_provider(provider_id)
+    if not provider:
+        return jsonify({"error": "Provider not found"}), 404
+    models = getattr(provider, "models", None)
+    if models is None:
+        return jsonify({"models": []})
+    return jsonify(models.stats())
+
+@app.route("/api/rates", methods=["GET"])
+def get_rates():
+    return jsonify({"rates": RATE_MODEL.snapshot()})
+
+@app.route("/api/providers/auto/predict", methods=["GET"])
+def predict_auto_route():
+    chars = request.args.get("chars", 0, type=int)
+    speaker = request.args.get("speaker", SPEAKERS[0])
+    language = request.args.get("language", "en")
+    return jsonify(REGISTRY.get_provider("auto").predict(chars, speaker, language))
+
 @app.route("/api/providers/<provider_id>/settings", methods=["GET", "POST"])
 def provider_settings(provider_id):
     if request.method == "POST":
@@ -0,0 +1,82 @@
+# asgi.py
+#
+# Production entry point: the polled, read-heavy endpoints are async handlers
+# reading through db_async, everything else is the Flask app mounted as WSGI.
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+#
+# Keep it to one worker process: job queues and model state live in-process.
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import db_async
+from app import app as flask_app, build_status, build_jobs_status
+from rate_model import RATE_MODEL
+from tts_service import REGISTRY
+from config import WSGI_THREADS
+
+
+async def status(request):
+    data = await db_async.get_conversion_with_chunks(request.path_params["conversion_id"])
+    if not data:
+        return JSONResponse({"error": "Unknown job ID"}, status_code=404)
+    return JSONResponse(build_status(data))
+
+
+async def get_jobs_status(request):
+    conversions, remaining = await asyncio.gather(
+        db_async.get_all_conversions(),
+        db_async.get_remaining_chars(),
+    )
+    return JSONResponse(build_jobs_status(conversions, remaining))
+
+
+async def get_provider_voices(request):
+    provider = REGISTRY.get_provider(request.path_params["provider_id"])
+    if not provider:
+        return JSONResponse({"error": "Provider not found"}, status_code=404)
+    # Google lists voices over the network on a cold cache
+    voices = await asyncio.to_thread(provider.get_voices, language=request.query_params.get("language"))
+    return JSONResponse({"voices": voices})
+
+
+async def get_provider_languages(request):
+    provider = REGISTRY.get_provider(request.path_params["provider_id"])
+    if not provider:
+        return JSONResponse({"error": "Provider not found"}, status_code=404)
+    languages = await asyncio.to_thread(provider.get_languages)
+    return JSONResponse({"languages": languages})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # The async handlers estimate with RATE_MODEL, whose first use reads the
+    # whole chunks table under DB_LOCK; do that off the event loop
+    await asyncio.to_thread(RATE_MODEL.preload)
+    yield
+    await db_async.close()
+
+
+app = Starlette(
+    routes=[
+        Route("/status/{conversion_id}", status, methods=["GET"]),
+        Route("/api/jobs/status", get_jobs_status, methods=["GET"]),
+        Route("/api/providers/{provider_id}/voices", get_provider_voices, methods=["GET"]),
+        Route("/api/providers/{provider_id}/languages", get_provider_languages, methods=["GET"]),
+        # Threaded like the development server, so a slow export does not hold up other requests
+        Mount("/", app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=5000, workers=1)
@@ -0,0 +1,100 @@
+# audio_processing.py
+#
+# Post-synthesis cleanup of a chunk: leading/trailing silence trimming and
+# loudness normalization, both from one pass of frame energies.
+
+import os
+
+import numpy as np
+import soundfile as sf
+
+import resampling
+from config import (
+    TARGET_SAMPLE_RATE, SILENCE_FRAME_MS, SILENCE_THRESHOLD_DB, SILENCE_FLOOR_DBFS, SILENCE_PAD_MS,
+    LOUDNESS_TARGET_DBFS, LOUDNESS_MAX_GAIN_DB, PEAK_CEILING_DBFS,
+)
+
+
+def frame_levels(audio: np.ndarray, frame: int) -> np.ndarray:
+    """RMS level in dBFS of consecutive frames of `frame` samples."""
+    frames = -(-audio.size // frame)
+    padded = np.zeros(frames * frame, dtype=np.float32)
+    padded[:audio.size] = audio
+    power = np.square(padded.reshape(frames, frame)).mean(axis=1)
+    return 10 * np.log10(np.maximum(power, 1e-12))
+
+
+def _active_frames(levels: np.ndarray) -> np.ndarray:
+    threshold = max(SILENCE_FLOOR_DBFS, levels.max() + SILENCE_THRESHOLD_DB)
+    return levels > threshold
+
+
+def trim_silence(audio: np.ndarray, sr: int, levels: np.ndarray = None) -> np.ndarray:
+    """Cut leading and trailing silence, keeping SILENCE_PAD_MS around the speech."""
+    frame = max(1, sr * SILENCE_FRAME_MS // 1000)
+    if levels is None:
+        levels = frame_levels(audio, frame)
+    active = np.flatnonzero(_active_frames(levels))
+    if active.size == 0:
+        # Nothing above the floor; leave it rather than produce an empty chunk
+        return audio
+
+    pad = sr * SILENCE_PAD_MS // 1000
+    start = max(0, active[0] * frame - pad)
+    end = min(audio.size, (active[-1] + 1) * frame + pad)
+    return audio[start:end]
+
+
+def normalize_loudness(audio: np.ndarray, sr: int, levels: np.ndarray = None) -> np.ndarray:
+    """
+    Scale to LOUDNESS_TARGET_DBFS of RMS over the active (non-silent) frames,
+    capped at LOUDNESS_MAX_GAIN_DB and by the PEAK_CEILING_DBFS sample peak.
+    """
+    if audio.size == 0:
+        return audio
+    frame = max(1, sr * SILENCE_FRAME_MS // 1000)
+    if levels is None:
+        levels = frame_levels(audio, frame)
+    gated = levels[_active_frames(levels)]
+    if gated.size == 0:
+        return audio
+
+    # Average power of the speech, not of the pauses between words
+    loudness = 10 * np.log10(np.mean(np.power(10.0, gated / 10)))
+    gain_db = np.clip(LOUDNESS_TARGET_DBFS - loudness, -LOUDNESS_MAX_GAIN_DB, LOUDNESS_MAX_GAIN_DB)
+    gain = 10 ** (gain_db / 20)
+
+    peak = np.abs(audio).max() * gain
+    ceiling = 10 ** (PEAK_CEILING_DBFS / 20)
+    if peak > ceiling:
+        gain *= ceiling / peak
+    return (audio * gain).astype(np.float32)
+
+
+def process_file(path: str, target_sr: int = TARGET_SAMPLE_RATE) -> dict:
+    """
+    Trim, resample to target_sr and normalize one chunk file. Returns the
+    processed mono audio with its sample rate and the duration and size
+    before and after; the file itself is left untouched.
+    """
+    audio, sr = sf.read(path, dtype="float32", always_2d=False)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    raw_seconds = audio.size / sr
+
+    frame = max(1, sr * SILENCE_FRAME_MS // 1000)
+    levels = frame_levels(audio, frame)
+    trimmed = trim_silence(audio, sr, levels)
+    # Stored at the export rate, so exports never resample these chunks
+    trimmed = resampling.resample(trimmed, sr, target_sr)
+    # Trimming only removes whole silent frames, so the remaining levels
+    # still gate the same speech
+    processed = normalize_loudness(trimmed, target_sr, levels)
+
+    return {
+        "audio": processed,
+        "sr": target_sr,
+        "raw_seconds": raw_seconds,
+        "seconds": processed.size / target_sr,
+        "raw_bytes": os.path.getsize(path),
+    }
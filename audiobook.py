@@ -0,0 +1,355 @@
+# audiobook.py
+#
+# Chaptered audiobook export. Each paragraph becomes a chapter whose audio is
+# stored as FLAC as soon as all of its chunks are done. Finished chunks are fed
+# in book order into one running AAC encode per conversion, so the book is
+# encoded while it is synthesized; after the last chunk only the end of the
+# encode and a stream-copy into an M4B with chapter marks remain.
+# Needs the ffmpeg binary (FFMPEG_BINARY).
+
+import hashlib
+import itertools
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import soundfile as sf
+
+import db
+import resampling
+from chunking import split_into_paragraphs
+from config import FFMPEG_BINARY, EXPORT_BITRATE, EXPORT_MAX_ENCODERS, TARGET_SAMPLE_RATE
+
+AUDIOBOOK_FILE = "audiobook.m4b"
+SEGMENT_DIR = "chapters"
+STREAM_FILE = "stream.mp4"
+CHAPTER_LIST_FILE = "chapters.txt"
+CHAPTER_TITLE_CHARS = 60
+
+# Running encodes by conversion id, least recently fed first. Only the export
+# thread touches them.
+_ENCODERS = {}
+
+
+def is_available() -> bool:
+    return shutil.which(FFMPEG_BINARY) is not None
+
+
+def _chapter_title(sentence: str) -> str:
+    if len(sentence) <= CHAPTER_TITLE_CHARS:
+        return sentence
+    return sentence[:CHAPTER_TITLE_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+def plan_chapters(data: dict) -> list[dict]:
+    """
+    Chunks of a conversion grouped by paragraph. A chapter's key is derived
+    from its chunk ids, which edits preserve for unchanged sentences, so an
+    encoded chapter stays valid until one of its sentences changes.
+    """
+    chunks = data["chunks"]
+    if not chunks:
+        return []
+    paragraphs = split_into_paragraphs(data.get("text") or "")
+    if sum(len(p) for p in paragraphs) != len(chunks):
+        # Text and chunks out of step; export it as a single chapter
+        paragraphs = [[c["text"] for c in chunks]]
+
+    chapters = []
+    start = 0
+    for para in paragraphs:
+        members = chunks[start:start + len(para)]
+        start += len(para)
+        ids = ",".join(str(c["id"]) for c in members)
+        chapters.append({
+            "title": _chapter_title(para[0]),
+            "chunks": members,
+            "key": hashlib.sha1(ids.encode()).hexdigest()[:16],
+        })
+    return chapters
+
+
+def _ffmpeg(args: list[str]):
+    result = subprocess.run([FFMPEG_BINARY, "-v", "error", "-y", *args], capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+
+
+def _chunks_unchanged(chunks: list[dict]) -> bool:
+    for c in chunks:
+        row = db.get_chunk_by_id(c["id"])
+        if not row or row["status"] != "done" or row["audio_filename"] != c["audio_filename"]:
+            return False
+    return True
+
+
+def _read_chunks(chunks: list[dict], job_dir: str):
+    """
+    Joined audio of finished chunks, or None if an edit has replaced or
+    renumbered them. Read without the conversion's work lock, so the rows are
+    checked again afterwards: an edit that moved files mid-read changes them,
+    and it schedules another export once it is done.
+    """
+    if not _chunks_unchanged(chunks):
+        return None
+    parts = []
+    try:
+        for c in chunks:
+            # Uncached: a conversion cached here could outlive an edit's clear_cache
+            audio, _ = resampling.load_resampled(
+                os.path.join(job_dir, os.path.basename(c["audio_filename"])), TARGET_SAMPLE_RATE, use_cache=False
+            )
+            parts.append(audio)
+    except (OSError, RuntimeError):
+        return None
+    if not _chunks_unchanged(chunks):
+        return None
+    return np.concatenate(parts)
+
+
+def _write_segment(audio: np.ndarray, path: str):
+    # Lossless, so the book's single AAC encode is the only one and chapter
+    # boundaries get no encoder priming or padding of their own
+    tmp = path + ".tmp"
+    sf.write(tmp, audio, TARGET_SAMPLE_RATE, subtype="PCM_16", format="FLAC")
+    os.replace(tmp, path)
+
+
+def _escape_metadata(value: str) -> str:
+    for ch in ("\\", "=", ";", "#", "\n"):
+        value = value.replace(ch, "\\" + ch)
+    return value
+
+
+def _write_metadata(path: str, data: dict, chapters: list[dict], ends: list[int]):
+    title = _escape_metadata(data.get("title") or "")
+    lines = [";FFMETADATA1", f"title={title}", f"album={title}", "genre=Audiobook"]
+    if data.get("speaker"):
+        lines.append(f"artist={_escape_metadata(data['speaker'])}")
+
+    # Marks in samples of the audio actually encoded, so they cannot drift
+    start = 0
+    for chapter, end in zip(chapters, ends):
+        lines += [
+            "[CHAPTER]",
+            f"TIMEBASE=1/{TARGET_SAMPLE_RATE}",
+            f"START={start}",
+            f"END={end}",
+            f"title={_escape_metadata(chapter['title'])}",
+        ]
+        start = end
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+class _Encoder:
+    """A conversion's AAC encode, fed PCM in book order as chunks finish."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ids = []
+        # Chunks fed -> samples fed, after every feed
+        self.frames = {0: 0}
+        self.proc = subprocess.Popen(
+            [
+                FFMPEG_BINARY, "-v", "error", "-y",
+                "-f", "s16le", "-ar", str(TARGET_SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+                "-c:a", "aac", "-b:a", EXPORT_BITRATE,
+                # Fragmented so it is written as it goes; delay_moov keeps the
+                # encoder delay, which the stream-copy into the M4B relies on
+                "-f", "mp4", "-movflags", "frag_keyframe+empty_moov+delay_moov", path,
+            ],
+            stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+
+    def feed(self, ids: list[int], pcm: np.ndarray):
+        try:
+            self.proc.stdin.write(pcm.tobytes())
+            self.proc.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            self.proc.kill()
+            self.proc.wait()
+            raise RuntimeError(f"ffmpeg failed: {self.proc.stderr.read().decode(errors='replace').strip()}")
+        self.frames[len(self.ids) + len(ids)] = self.frames[len(self.ids)] + len(pcm)
+        self.ids += ids
+
+    def finish(self):
+        """Flush the encoder and wait for the stream to be complete."""
+        self.proc.stdin.close()
+        error = self.proc.stderr.read()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {error.decode(errors='replace').strip()}")
+
+    def close(self):
+        """Stop the encode and remove its stream."""
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        for pipe in (self.proc.stdin, self.proc.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _close_encoder(conversion_id: str):
+    encoder = _ENCODERS.pop(conversion_id, None)
+    if encoder:
+        encoder.close()
+
+
+def _encoder(conversion_id: str, segment_dir: str, chunk_ids: list[int]) -> _Encoder:
+    """The conversion's running encode, restarted if it no longer matches the chunks."""
+    encoder = _ENCODERS.pop(conversion_id, None)
+    if encoder and (encoder.ids != chunk_ids[:len(encoder.ids)] or encoder.proc.poll() is not None):
+        # An edit changed audio that is already encoded, or ffmpeg exited
+        encoder.close()
+        encoder = None
+    if encoder is None:
+        while len(_ENCODERS) >= max(EXPORT_MAX_ENCODERS, 1):
+            # Stalled conversions give up theirs; it restarts from their stored chapters
+            _close_encoder(next(iter(_ENCODERS)))
+        encoder = _Encoder(os.path.join(segment_dir, STREAM_FILE))
+    _ENCODERS[conversion_id] = encoder
+    return encoder
+
+
+def _pcm16(audio: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(audio * 32767), -32768, 32767).astype("<i2")
+
+
+def _feed(encoder: _Encoder, chapters: list[dict], segment_paths: list[str], job_dir: str) -> bool:
+    """
+    Feed the finished chunks at the front of the book that the encode has not
+    had yet: stored chapters whole, chunks of the chapter in progress one by
+    one. False if an edit replaced a chunk in the meantime.
+    """
+    start = 0
+    for chapter, path in zip(chapters, segment_paths):
+        chunks = chapter["chunks"]
+        end = start + len(chunks)
+        if len(encoder.ids) >= end:
+            start = end
+            continue
+        if len(encoder.ids) == start and os.path.exists(path):
+            audio, _ = sf.read(path, dtype="int16")
+            encoder.feed([c["id"] for c in chunks], audio)
+            start = end
+            continue
+        for c in chunks[len(encoder.ids) - start:]:
+            if c["status"] != "done":
+                return True
+            audio = _read_chunks([c], job_dir)
+            if audio is None:
+                return False
+            encoder.feed([c["id"]], _pcm16(audio))
+        start = end
+    return True
+
+
+def build(conversion_id: str, job_dir: str):
+    """
+    Store every chapter whose chunks are all done, feed the finished chunks at
+    the front of the book to the conversion's running encode and, once all are
+    in, write the M4B. Chunk audio is read without the work lock, so exports
+    never wait on synthesis.
+    """
+    data = db.get_conversion_with_chunks(conversion_id)
+    if not data or not data["chunks"]:
+        _close_encoder(conversion_id)
+        return
+
+    chapters = plan_chapters(data)
+    segment_dir = os.path.join(job_dir, SEGMENT_DIR)
+    os.makedirs(segment_dir, exist_ok=True)
+    chunk_ids = [c["id"] for c in data["chunks"]]
+    total = len(chunk_ids)
+
+    final_path = os.path.join(job_dir, AUDIOBOOK_FILE)
+    list_path = os.path.join(segment_dir, CHAPTER_LIST_FILE)
+    listing = "".join(f"{chapter['key']}\n" for chapter in chapters)
+    if os.path.exists(final_path) and os.path.exists(list_path):
+        with open(list_path, encoding="utf-8") as f:
+            if f.read() == listing:
+                _close_encoder(conversion_id)
+                db.update_export_status(conversion_id, "ready", 1.0)
+                return
+    encoder = _ENCODERS.get(conversion_id)
+    db.update_export_status(conversion_id, "building", len(encoder.ids) / total if encoder else 0.0)
+
+    segment_paths = []
+    for chapter in chapters:
+        path = os.path.join(segment_dir, f"{chapter['key']}.flac")
+        segment_paths.append(path)
+        if os.path.exists(path) or any(c["status"] != "done" for c in chapter["chunks"]):
+            continue
+        audio = _read_chunks(chapter["chunks"], job_dir)
+        if audio is None:
+            # An edit is rescheduling the export
+            return
+        _write_segment(audio, path)
+
+    if data["chunks"][0]["status"] == "done" or encoder:
+        encoder = _encoder(conversion_id, segment_dir, chunk_ids)
+        try:
+            if not _feed(encoder, chapters, segment_paths, job_dir):
+                return
+        except Exception:
+            _close_encoder(conversion_id)
+            raise
+
+    fed = len(encoder.ids) if encoder else 0
+    if fed < total:
+        # Left over from before an edit
+        if os.path.exists(final_path):
+            os.remove(final_path)
+        db.update_export_status(conversion_id, "building", fed / total)
+        return
+
+    db.update_export_status(conversion_id, "building", 0.99)
+    del _ENCODERS[conversion_id]
+    try:
+        encoder.finish()
+        metadata_path = os.path.join(segment_dir, "metadata.txt")
+        ends = [encoder.frames[n] for n in itertools.accumulate(len(c["chunks"]) for c in chapters)]
+        _write_metadata(metadata_path, data, chapters, ends)
+        tmp = final_path + ".tmp"
+        _ffmpeg([
+            "-i", encoder.path, "-i", metadata_path,
+            "-map", "0:a", "-map_metadata", "1", "-map_chapters", "1",
+            "-c", "copy", "-movflags", "+faststart", "-f", "ipod", tmp,
+        ])
+        os.replace(tmp, final_path)
+    finally:
+        encoder.close()
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write(listing)
+
+    # Chapters of sentences that have since been edited away, and AAC
+    # segments from before chapters were stored as FLAC
+    keep = {os.path.basename(p) for p in segment_paths}
+    for name in os.listdir(segment_dir):
+        if name.endswith((".flac", ".m4a")) and name not in keep:
+            os.remove(os.path.join(segment_dir, name))
+
+    db.update_export_status(conversion_id, "ready", 1.0)
+
+
+def update_title(conversion_id: str, job_dir: str):
+    """Rewrite the title tags of a finished M4B without re-encoding."""
+    final_path = os.path.join(job_dir, AUDIOBOOK_FILE)
+    data = db.get_conversion(conversion_id)
+    if not data or not os.path.exists(final_path):
+        return
+
+    title = data.get("title") or ""
+    tmp = final_path + ".tmp"
+    _ffmpeg([
+        "-i", final_path, "-map", "0:a", "-map_metadata", "0", "-map_chapters", "0",
+        "-metadata", f"title={title}", "-metadata", f"album={title}",
+        "-c", "copy", "-movflags", "+faststart", "-f", "ipod", tmp,
+    ])
+    os.replace(tmp, final_path)
@@ -0,0 +1,124 @@
+# benchmarks/poll_load.py
+#
+# Simulates open browser tabs polling a running server: each poller requests
+# /status/<id> every second and /api/jobs/status every two, like main.js.
+# Steps up the number of pollers and reports latency and whether the server
+# kept up, to compare the two serving modes:
+#
+#   python app.py                             (before: Flask development server)
+#   uvicorn asgi:app --port 5000              (after: async endpoints)
+#
+# Usage: python benchmarks/poll_load.py <base_url> <conversion_id> [pollers,...] [seconds]
+# e.g.   python benchmarks/poll_load.py http://127.0.0.1:5000 3f2a... 50,100,200,400,800 20
+
+import asyncio
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+# A level counts as handled while the p95 latency stays below this
+MAX_P95_SECONDS = 0.5
+
+
+async def _get(reader, writer, host: str, path: str):
+    """Returns (status, keep_alive)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    # The development server answers HTTP/1.0 and closes after each response
+    keep_alive = status_line.startswith(b"HTTP/1.1")
+    length = None
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection":
+            keep_alive = value == "keep-alive" or (keep_alive and value != "close")
+    if length is None:
+        await reader.read()
+        keep_alive = False
+    else:
+        await reader.readexactly(length)
+    return int(status_line.split()[1]), keep_alive
+
+
+async def _poller(host: str, port: int, conversion_id: str, deadline: float, latencies: list, errors: list):
+    reader = writer = None
+    tick = 0
+    while time.perf_counter() < deadline:
+        paths = [f"/status/{conversion_id}"]
+        if tick % 2 == 0:
+            paths.append("/api/jobs/status")
+        started = time.perf_counter()
+        for path in paths:
+            t0 = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                status, keep_alive = await _get(reader, writer, f"{host}:{port}", path)
+                if status != 200:
+                    errors.append(status)
+                latencies.append(time.perf_counter() - t0)
+                if not keep_alive:
+                    writer.close()
+                    reader = writer = None
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+                errors.append(type(e).__name__)
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+        tick += 1
+        await asyncio.sleep(max(0.0, 1.0 - (time.perf_counter() - started)))
+    if writer is not None:
+        writer.close()
+
+
+async def run_level(host: str, port: int, conversion_id: str, pollers: int, seconds: float) -> dict:
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(
+        _poller(host, port, conversion_id, deadline, latencies, errors) for _ in range(pollers)
+    ))
+    latencies.sort()
+    # What the pollers asked for: 1.5 requests per poller per second
+    expected = pollers * 1.5 * seconds
+    return {
+        "pollers": pollers,
+        "requests": len(latencies),
+        "rps": len(latencies) / seconds,
+        "kept_up": min(1.0, len(latencies) / expected) if expected else 0.0,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else float("nan"),
+        "errors": len(errors),
+    }
+
+
+async def main():
+    if len(sys.argv) < 3:
+        print("Usage: python benchmarks/poll_load.py <base_url> <conversion_id> [pollers,...] [seconds]")
+        sys.exit(1)
+    url = urlsplit(sys.argv[1])
+    host, port = url.hostname, url.port or 80
+    conversion_id = sys.argv[2]
+    levels = [int(n) for n in sys.argv[3].split(",")] if len(sys.argv) > 3 else [50, 100, 200, 400, 800]
+    seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 20.0
+
+    handled = 0
+    print(f"{'pollers':>8} {'req/s':>8} {'kept up':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for pollers in levels:
+        r = await run_level(host, port, conversion_id, pollers, seconds)
+        print(f"{r['pollers']:8} {r['rps']:8.1f} {r['kept_up']:8.0%} {r['p50'] * 1000:8.1f} {r['p95'] * 1000:8.1f} {r['errors']:7}")
+        if r["errors"] == 0 and r["p95"] < MAX_P95_SECONDS and r["kept_up"] > 0.95:
+            handled = pollers
+    print(f"Handled up to {handled} concurrent pollers (p95 < {MAX_P95_SECONDS * 1000:.0f} ms, no errors)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
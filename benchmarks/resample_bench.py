@@ -0,0 +1,82 @@
+# benchmarks/resample_bench.py
+#
+# Times reading and resampling an hour of chunk audio the way a full export
+# does: the previous librosa path, scipy polyphase, soxr, and the cached and
+# matching-rate paths of resampling.load_resampled.
+# Usage: python benchmarks/resample_bench.py [minutes=60] [source_rate=22050]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import soundfile as sf
+
+import resampling
+from config import TARGET_SAMPLE_RATE
+
+CHUNK_SECONDS = 5
+
+
+def _write_chunks(directory: str, minutes: float, sr: int) -> list[str]:
+    rng = np.random.default_rng(0)
+    t = np.arange(CHUNK_SECONDS * sr) / sr
+    paths = []
+    for i in range(int(minutes * 60 / CHUNK_SECONDS)):
+        # Speech-like: a wandering tone with noise, at a varying level
+        audio = 0.3 * np.sin(2 * np.pi * (150 + 50 * rng.random()) * t) + 0.05 * rng.standard_normal(t.size)
+        path = os.path.join(directory, f"part_{i}.wav")
+        sf.write(path, audio.astype(np.float32), sr, subtype="PCM_16")
+        paths.append(path)
+    return paths
+
+
+def _time(label: str, paths: list[str], load, audio_seconds: float):
+    start = time.perf_counter()
+    for p in paths:
+        load(p)
+    elapsed = time.perf_counter() - start
+    print(f"{label:34} {elapsed:8.2f} s   {audio_seconds / elapsed:9.0f}x real time")
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    source_sr = int(sys.argv[2]) if len(sys.argv) > 2 else 22050
+    audio_seconds = minutes * 60
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mismatched = os.path.join(tmp, "mismatched")
+        matching = os.path.join(tmp, "matching")
+        os.makedirs(mismatched)
+        os.makedirs(matching)
+        paths = _write_chunks(mismatched, minutes, source_sr)
+        same_paths = _write_chunks(matching, minutes, TARGET_SAMPLE_RATE)
+        print(f"{len(paths)} chunks, {minutes:g} min at {source_sr} Hz -> {TARGET_SAMPLE_RATE} Hz")
+
+        try:
+            import librosa
+
+            _time("librosa.load + resample (before)", paths,
+                  lambda p: librosa.resample(librosa.load(p, sr=None, mono=True)[0], orig_sr=source_sr, target_sr=TARGET_SAMPLE_RATE),
+                  audio_seconds)
+        except ImportError:
+            print("librosa not installed, skipping the previous path")
+
+        uncached = lambda p: resampling.load_resampled(p, TARGET_SAMPLE_RATE, use_cache=False)
+        soxr = resampling.soxr
+        if soxr is not None:
+            _time("soxr HQ", paths, uncached, audio_seconds)
+        resampling.soxr = None
+        _time("scipy polyphase", paths, uncached, audio_seconds)
+        resampling.soxr = soxr
+
+        _time("first export (resample + cache)", paths, lambda p: resampling.load_resampled(p, TARGET_SAMPLE_RATE), audio_seconds)
+        _time("repeated export (cached)", paths, lambda p: resampling.load_resampled(p, TARGET_SAMPLE_RATE), audio_seconds)
+        _time("matching rate (no resampling)", same_paths, lambda p: resampling.load_resampled(p, TARGET_SAMPLE_RATE), audio_seconds)
+
+
+if __name__ == "__main__":
+    main()
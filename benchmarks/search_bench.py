@@ -0,0 +1,63 @@
+# benchmarks/search_bench.py
+#
+# Measures search latency over a synthetic history of conversions.
+# Usage: python benchmarks/search_bench.py [num_documents] [sentences_per_document]
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import db
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog river mountain castle winter summer "
+    "garden library engine signal voice story chapter letter window forest silver "
+    "harbor candle machine pocket shadow market bridge captain painter doctor "
+    "journey morning evening thunder whisper lantern compass orchard meadow"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def main():
+    num_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    per_doc = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    rng = random.Random(42)
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    db.DB_FILE = path
+    try:
+        db.init_db()
+
+        start = time.perf_counter()
+        for i in range(num_docs):
+            chunks = [_sentence(rng) for _ in range(per_doc)]
+            db.create_conversion(f"Document {i} {rng.choice(WORDS)}", " ".join(chunks), chunks)
+        ingest = time.perf_counter() - start
+        print(f"Indexed {num_docs} documents ({num_docs * per_doc} chunks) in {ingest:.1f}s, FTS5={db.FTS_ENABLED}")
+
+        queries = ["fox", "silver lantern", "capt", "harbor bridge thunder", "document 42", "whisper orchard"]
+        for q in queries:
+            timings = []
+            for _ in range(20):
+                t0 = time.perf_counter()
+                results = db.search(q)
+                timings.append((time.perf_counter() - t0) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{q!r:28} {len(results):3} hits  median {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,3 +24,72 @@ LANGUAGES = [
 
 DEFAULT_CHUNK_SIZE = 350
 TARGET_SAMPLE_RATE = 24000
+
+# Local model lifecycle. Only one model (MODEL_NAME) is ever loaded per device,
+# so memory is bounded by sharing one instance per device and the idle timeout;
+# a budget can only refuse a model that does not fit, never make room for it.
+MODEL_MEMORY_BUDGET_MB = 0      # host RAM for CPU models, larger models are refused; 0 disables
+MODEL_VRAM_BUDGET_MB = 0        # GPU memory for CUDA models, larger models are refused; 0 disables
+MODEL_IDLE_TIMEOUT = 600        # seconds before an unused model is unloaded, 0 keeps it loaded
+MODEL_SIZE_ESTIMATE_MB = 2000   # used before a model has been measured
+
+# Chunk synthesis retries
+CHUNK_MAX_ATTEMPTS = 3          # total attempts per chunk
+CHUNK_RETRY_BACKOFF = 2.0       # seconds, doubled after every failed attempt
+
+# Audio serving
+AUDIO_CACHE_MAX_AGE = 31536000  # seconds finished chunk audio may be cached
+AUDIO_SENDFILE = None           # None, "x-sendfile" (Apache/lighttpd) or "x-accel-redirect" (nginx)
+AUDIO_ACCEL_PREFIX = "/_audio/" # nginx internal location that maps to the static folder
+
+# Auto provider routing
+# XTTS speakers with a female voice; all others are mapped to male Google voices
+FEMALE_SPEAKERS = {
+    "Claribel Dervla", "Daisy Studious", "Gracie Wise", "Tammie Ema", "Alison Dietlinde",
+    "Ana Florence", "Annmarie Nele", "Asya Anara", "Brenda Stern", "Gitta Nikolina",
+    "Henriette Usha", "Sofia Hellen", "Tammy Grit", "Tanja Adelina", "Vjollca Johnnie",
+    "Nova Hogarth", "Maja Ruoho", "Uta Obando", "Lidiya Szekeres", "Chandra MacFarland",
+    "Szofi Granger", "Camilla Holmström", "Lilya Stainthorpe", "Zofija Kendrick", "Narelle Moon",
+    "Barbora MacLean", "Alexandra Hisakawa", "Alma María", "Rosemary Okafor",
+}
+
+# XTTS language code -> Google language code
+GOOGLE_LANGUAGE_CODES = {
+    "en": "en-US", "es": "es-ES", "fr": "fr-FR", "de": "de-DE", "it": "it-IT",
+    "pt": "pt-BR", "pl": "pl-PL", "tr": "tr-TR", "ru": "ru-RU", "nl": "nl-NL",
+    "cs": "cs-CZ", "ar": "ar-XA", "zh-cn": "cmn-CN", "hu": "hu-HU", "ko": "ko-KR",
+    "ja": "ja-JP", "hi": "hi-IN",
+}
+GOOGLE_VOICE_TIER = "Neural2"           # preferred voice family, falls back to any voice
+GOOGLE_COST_PER_MILLION_CHARS = 16.0    # USD, Neural2/WaveNet pricing
+AUTO_MONTHLY_BUDGET_USD = 0.0           # default Google spend allowed for auto routing
+AUDIO_SECONDS_PER_CHAR = 0.065          # speech length estimate used for queue backlog
+AUTO_DEFAULT_RTF = {"local": 1.0, "google": 0.1}  # wall time / audio time before measurements
+
+# Job queue priorities, lower runs first
+JOB_PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+MAX_BULK_DOCUMENTS = 5000
+
+# Waveform peaks: (min, max) pairs per second of audio stored next to each chunk
+PEAKS_PER_SECOND = 20
+
+# Post-synthesis processing: silence trimming and loudness normalization
+POSTPROCESS_ENABLED = True
+POSTPROCESS_WORKERS = 2
+SILENCE_FRAME_MS = 10              # energy frame length
+SILENCE_THRESHOLD_DB = -40.0       # frames this far below the loudest frame are silence
+SILENCE_FLOOR_DBFS = -60.0         # frames below this level are always silence
+SILENCE_PAD_MS = 100               # silence kept before and after the speech
+LOUDNESS_TARGET_DBFS = -20.0       # RMS over non-silent frames
+LOUDNESS_MAX_GAIN_DB = 20.0
+PEAK_CEILING_DBFS = -1.0
+
+# Async serving (asgi.py): read-only connections shared by the async endpoints
+ASYNC_DB_READERS = 4
+WSGI_THREADS = 16              # threads serving the remaining (Flask) endpoints
+
+# Chaptered audiobook export (M4B, AAC), built in the background as chapters finish
+EXPORT_ENABLED = True
+FFMPEG_BINARY = "ffmpeg"
+EXPORT_BITRATE = "64k"
+EXPORT_MAX_ENCODERS = 4         # conversions encoding at once, one ffmpeg process each
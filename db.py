@@ -1,11 +1,15 @@
 import sqlite3
 import json
+import re
 import uuid
 from datetime import datetime
 from threading import Lock
 
+from config import JOB_PRIORITIES
+
 DB_FILE = "tts_app.db"
 DB_LOCK = Lock()
+FTS_ENABLED = False
 
 def get_connection():
     conn = sqlite3.connect(DB_FILE, check_same_thread=False)
@@ -16,6 +20,9 @@ def init_db():
     with DB_LOCK:
         conn = get_connection()
         c = conn.cursor()
+
+        # Readers (db_async) then never wait for a writer, nor writers for readers
+        c.execute("PRAGMA journal_mode=WAL")
         
         # Conversions table
         c.execute("""
@@ -32,7 +39,9 @@ def init_db():
                 language TEXT,
                 provider TEXT DEFAULT 'local',
                 estimated_duration REAL DEFAULT 0.0,
-                total_duration REAL DEFAULT 0.0
+                total_duration REAL DEFAULT 0.0,
+                priority INTEGER,
+                use_cuda INTEGER DEFAULT 1
             )
         """)
         
@@ -62,6 +71,28 @@ def init_db():
         except sqlite3.OperationalError:
             pass 
 
+        try:
+            c.execute("ALTER TABLE conversions ADD COLUMN export_status TEXT")
+        except sqlite3.OperationalError:
+            pass
+
+        try:
+            c.execute("ALTER TABLE conversions ADD COLUMN export_progress REAL DEFAULT 0.0")
+        except sqlite3.OperationalError:
+            pass
+
+        try:
+            c.execute("ALTER TABLE conversions ADD COLUMN priority INTEGER")
+        except sqlite3.OperationalError:
+            pass
+        c.execute("UPDATE conversions SET priority = ? WHERE priority IS NULL", (JOB_PRIORITIES["normal"],))
+
+        try:
+            # Before this was stored, retries and edits always asked for the GPU
+            c.execute("ALTER TABLE conversions ADD COLUMN use_cuda INTEGER DEFAULT 1")
+        except sqlite3.OperationalError:
+            pass
+
         # Provider Settings table
         c.execute("""
             CREATE TABLE IF NOT EXISTS provider_settings (
@@ -80,6 +111,9 @@ def init_db():
                 status TEXT NOT NULL DEFAULT 'pending',
                 audio_filename TEXT,
                 duration REAL DEFAULT 0.0,
+                synth_seconds REAL DEFAULT 0.0,
+                trimmed_seconds REAL DEFAULT 0.0,
+                saved_bytes INTEGER DEFAULT 0,
                 FOREIGN KEY (conversion_id) REFERENCES conversions (id)
             )
         """)
@@ -88,37 +122,174 @@ def init_db():
             c.execute("ALTER TABLE chunks ADD COLUMN duration REAL DEFAULT 0.0")
         except sqlite3.OperationalError:
             pass 
+
+        try:
+            c.execute("ALTER TABLE chunks ADD COLUMN synth_seconds REAL DEFAULT 0.0")
+        except sqlite3.OperationalError:
+            pass
+
+        try:
+            c.execute("ALTER TABLE chunks ADD COLUMN trimmed_seconds REAL DEFAULT 0.0")
+        except sqlite3.OperationalError:
+            pass
+
+        try:
+            c.execute("ALTER TABLE chunks ADD COLUMN saved_bytes INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+
+        c.execute("CREATE INDEX IF NOT EXISTS idx_chunks_conversion ON chunks (conversion_id, seq_num)")
+
+        # Queues and workers live in memory, so nothing survives a restart to
+        # finish these; put them back to pending and let a retry pick them up
+        c.execute("UPDATE chunks SET status = 'pending' WHERE status = 'processing'")
+        interrupted = c.rowcount
+        c.execute("""
+            UPDATE conversions SET status = 'error'
+            WHERE status IN ('queued', 'processing')
+              AND id IN (SELECT conversion_id FROM chunks WHERE status = 'pending')
+        """)
+        if interrupted or c.rowcount:
+            print(f"[INFO] {c.rowcount} conversions were interrupted ({interrupted} chunks mid-synthesis); retry them to resume")
+
+        _init_fts(c)
         
         conn.commit()
         conn.close()
 
-def create_conversion(title: str, text: str, chunks_data: list[str], speaker: str = None, language: str = None, provider: str = 'local', estimated_duration: float = 0.0) -> str:
+def _init_fts(c):
+    """Create the full-text search tables and backfill them on first use."""
+    global FTS_ENABLED
+    exists = c.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'conversions_fts'").fetchone()
+    mapped = c.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'conversion_search_ids'").fetchone()
+    try:
+        if exists and not mapped:
+            # Older index keyed on conversions.rowid, which VACUUM may renumber,
+            # or filtered by an unindexed conversion_id column
+            c.execute("DROP TABLE conversions_fts")
+            exists = None
+        # conversions has a TEXT key, so its search rows get a stable integer
+        # rowid here; deletes and renames then look rows up by rowid
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS conversion_search_ids (
+                rowid INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversion_id TEXT NOT NULL UNIQUE
+            )
+        """)
+        c.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS conversions_fts USING fts5(
+                title, text, tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        # rowids mirror chunks.id, an INTEGER PRIMARY KEY that VACUUM keeps
+        chunks_exists = c.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'chunks_fts'").fetchone()
+        c.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                text, tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"[WARN] SQLite FTS5 unavailable, search falls back to LIKE: {e}")
+        FTS_ENABLED = False
+        return
+
+    FTS_ENABLED = True
+    if not exists:
+        c.execute("DELETE FROM conversion_search_ids")
+        c.execute("INSERT INTO conversion_search_ids (conversion_id) SELECT id FROM conversions")
+        c.execute("""
+            INSERT INTO conversions_fts (rowid, title, text)
+            SELECT s.rowid, c.title, c.text FROM conversions c JOIN conversion_search_ids s ON s.conversion_id = c.id
+        """)
+    if not chunks_exists:
+        c.execute("INSERT INTO chunks_fts (rowid, text) SELECT id, text FROM chunks")
+
+def _index_conversion(conn, conversion_id: str):
+    """Add the search rows of one conversion. Call _unindex_conversion first when re-indexing."""
+    if not FTS_ENABLED:
+        return
+    search_id = conn.execute(
+        "INSERT INTO conversion_search_ids (conversion_id) VALUES (?)", (conversion_id,)
+    ).lastrowid
+    conn.execute("""
+        INSERT INTO conversions_fts (rowid, title, text)
+        SELECT ?, title, text FROM conversions WHERE id = ?
+    """, (search_id, conversion_id))
+    conn.execute("""
+        INSERT INTO chunks_fts (rowid, text)
+        SELECT id, text FROM chunks WHERE conversion_id = ?
+    """, (conversion_id,))
+
+def _unindex_conversion(conn, conversion_id: str):
+    """Remove the search rows of one conversion. Must run before its rows are deleted."""
+    if not FTS_ENABLED:
+        return
+    conn.execute("""
+        DELETE FROM conversions_fts WHERE rowid = (SELECT rowid FROM conversion_search_ids WHERE conversion_id = ?)
+    """, (conversion_id,))
+    conn.execute("DELETE FROM conversion_search_ids WHERE conversion_id = ?", (conversion_id,))
+    conn.execute("""
+        DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE conversion_id = ?)
+    """, (conversion_id,))
+
+def create_conversion(title: str, text: str, chunks_data: list[str], speaker: str = None, language: str = None, provider: str = 'local', estimated_duration: float = 0.0, priority: int = JOB_PRIORITIES["normal"], use_cuda: bool = True) -> str:
     """
     Creates a new conversion and its chunks transactionally.
     chunks_data is a listing of text strings.
     Returns the new conversion_id.
     """
-    conversion_id = str(uuid.uuid4())
-    total_chunks = len(chunks_data)
+    return create_conversions([{
+        "title": title,
+        "text": text,
+        "chunks": chunks_data,
+        "speaker": speaker,
+        "language": language,
+        "provider": provider,
+        "estimated_duration": estimated_duration,
+        "priority": priority,
+        "use_cuda": use_cuda,
+    }])[0]
+
+def create_conversions(items: list[dict]) -> list[str]:
+    """
+    Creates many conversions and their chunks in a single transaction.
+    Each item has 'title', 'text', 'chunks' and optionally 'speaker',
+    'language', 'provider', 'estimated_duration', 'priority' and 'use_cuda'.
+    Returns the new conversion_ids in input order.
+    """
+    conversion_ids = [str(uuid.uuid4()) for _ in items]
     
+    conv_rows = []
+    chunk_rows = []
+    for conversion_id, item in zip(conversion_ids, items):
+        chunks_data = item["chunks"]
+        conv_rows.append((
+            conversion_id, item["title"], item["text"], 'queued', len(chunks_data), 0,
+            item.get("speaker"), item.get("language"), item.get("provider", 'local'),
+            item.get("estimated_duration", 0.0), item.get("priority", JOB_PRIORITIES["normal"]),
+            int(item.get("use_cuda", True)),
+        ))
+        for i, chunk_text in enumerate(chunks_data):
+            chunk_rows.append((conversion_id, i, chunk_text, 'pending'))
+
     with DB_LOCK:
         conn = get_connection()
         try:
-            # 1. Insert Conversion
-            conn.execute("""
-                INSERT INTO conversions (id, title, text, status, total_chunks, processed_chunks, speaker, language, provider, estimated_duration)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (conversion_id, title, text, 'queued', total_chunks, 0, speaker, language, provider, estimated_duration))
+            # 1. Insert Conversions
+            conn.executemany("""
+                INSERT INTO conversions (id, title, text, status, total_chunks, processed_chunks, speaker, language, provider, estimated_duration, priority, use_cuda)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, conv_rows)
             
             # 2. Insert Chunks
-            chunk_rows = []
-            for i, chunk_text in enumerate(chunks_data):
-                chunk_rows.append((conversion_id, i, chunk_text, 'pending'))
-            
             conn.executemany("""
                 INSERT INTO chunks (conversion_id, seq_num, text, status)
                 VALUES (?, ?, ?, ?)
             """, chunk_rows)
+
+            # 3. Search index
+            for conversion_id in conversion_ids:
+                _index_conversion(conn, conversion_id)
             
             conn.commit()
         except Exception as e:
@@ -127,7 +298,7 @@ def create_conversion(title: str, text: str, chunks_data: list[str], speaker: st
         finally:
             conn.close()
             
-    return conversion_id
+    return conversion_ids
 
 def get_all_conversions():
     with DB_LOCK:
@@ -159,7 +330,7 @@ def get_conversion(conversion_id: str):
         conn.close()
         return dict(row) if row else None
 
-def update_chunk_status(conversion_id: str, seq_num: int, status: str, audio_filename: str = None, duration: float = 0.0):
+def update_chunk_status(conversion_id: str, seq_num: int, status: str, audio_filename: str = None, duration: float = 0.0, synth_seconds: float = 0.0, trimmed_seconds: float = 0.0, saved_bytes: int = 0):
     with DB_LOCK:
         conn = get_connection()
         try:
@@ -167,9 +338,9 @@ def update_chunk_status(conversion_id: str, seq_num: int, status: str, audio_fil
             if audio_filename:
                 conn.execute("""
                     UPDATE chunks 
-                    SET status = ?, audio_filename = ?, duration = ?
+                    SET status = ?, audio_filename = ?, duration = ?, synth_seconds = ?, trimmed_seconds = ?, saved_bytes = ?
                     WHERE conversion_id = ? AND seq_num = ?
-                """, (status, audio_filename, duration, conversion_id, seq_num))
+                """, (status, audio_filename, duration, synth_seconds, trimmed_seconds, saved_bytes, conversion_id, seq_num))
             else:
                  conn.execute("""
                     UPDATE chunks 
@@ -198,6 +369,13 @@ def update_chunk_status(conversion_id: str, seq_num: int, status: str, audio_fil
             conv_status = 'processing'
             if count == total:
                 conv_status = 'done'
+            else:
+                # Nothing left to work on but some chunks failed
+                remaining = conn.execute("""
+                    SELECT COUNT(*) FROM chunks WHERE conversion_id = ? AND status IN ('pending', 'processing')
+                """, (conversion_id,)).fetchone()[0]
+                if remaining == 0:
+                    conv_status = 'error'
             
             conn.execute("""
                 UPDATE conversions 
@@ -209,6 +387,169 @@ def update_chunk_status(conversion_id: str, seq_num: int, status: str, audio_fil
         finally:
             conn.close()
 
+def get_chunk(conversion_id: str, seq_num: int):
+    with DB_LOCK:
+        conn = get_connection()
+        row = conn.execute("SELECT * FROM chunks WHERE conversion_id = ? AND seq_num = ?", (conversion_id, seq_num)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+def get_chunk_by_id(chunk_id: int):
+    with DB_LOCK:
+        conn = get_connection()
+        row = conn.execute("SELECT * FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+def replace_chunks(conversion_id: str, text: str, chunks: list[dict], estimated_duration: float = 0.0):
+    """
+    Replaces the chunk list of a conversion transactionally after a text edit.
+    Each entry has 'seq_num' and 'text'; entries with an 'id' keep that existing
+    row (and its audio), all other rows are deleted and new ones inserted as pending.
+    """
+    keep_ids = [c["id"] for c in chunks if c.get("id") is not None]
+
+    with DB_LOCK:
+        conn = get_connection()
+        try:
+            _unindex_conversion(conn, conversion_id)
+
+            placeholders = ",".join("?" * len(keep_ids))
+            if keep_ids:
+                conn.execute(f"""
+                    DELETE FROM chunks WHERE conversion_id = ? AND id NOT IN ({placeholders})
+                """, (conversion_id, *keep_ids))
+            else:
+                conn.execute("DELETE FROM chunks WHERE conversion_id = ?", (conversion_id,))
+
+            for c in chunks:
+                if c.get("id") is not None:
+                    conn.execute("""
+                        UPDATE chunks SET seq_num = ?, audio_filename = ?
+                        WHERE id = ?
+                    """, (c["seq_num"], c.get("audio_filename"), c["id"]))
+                else:
+                    conn.execute("""
+                        INSERT INTO chunks (conversion_id, seq_num, text, status)
+                        VALUES (?, ?, ?, 'pending')
+                    """, (conversion_id, c["seq_num"], c["text"]))
+
+            count = conn.execute("""
+                SELECT COUNT(*) FROM chunks WHERE conversion_id = ? AND status = 'done'
+            """, (conversion_id,)).fetchone()[0]
+            total_dur = conn.execute("""
+                SELECT SUM(duration) FROM chunks WHERE conversion_id = ? AND status = 'done'
+            """, (conversion_id,)).fetchone()[0] or 0.0
+            conv_status = 'done' if count == len(chunks) else 'queued'
+
+            conn.execute("""
+                UPDATE conversions
+                SET text = ?, total_chunks = ?, processed_chunks = ?, status = ?, total_duration = ?, estimated_duration = ?
+                WHERE id = ?
+            """, (text, len(chunks), count, conv_status, total_dur, estimated_duration, conversion_id))
+
+            _index_conversion(conn, conversion_id)
+
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+def reset_failed_chunks(conversion_id: str) -> list[tuple[int, str]]:
+    """
+    Marks 'error' and 'pending' chunks as pending again and re-queues the conversion.
+    Returns (chunk_id, text) for every chunk that needs synthesis.
+    """
+    with DB_LOCK:
+        conn = get_connection()
+        try:
+            rows = conn.execute("""
+                SELECT id, text FROM chunks
+                WHERE conversion_id = ? AND status IN ('error', 'pending')
+                ORDER BY seq_num ASC
+            """, (conversion_id,)).fetchall()
+            if rows:
+                conn.execute("""
+                    UPDATE chunks SET status = 'pending'
+                    WHERE conversion_id = ? AND status = 'error'
+                """, (conversion_id,))
+                conn.execute("UPDATE conversions SET status = 'queued' WHERE id = ?", (conversion_id,))
+                conn.commit()
+            return [(row["id"], row["text"]) for row in rows]
+        finally:
+            conn.close()
+
+def get_pending_chunks(conversion_ids: list[str]) -> dict:
+    """(chunk_id, text) of the 'pending' and 'error' chunks per conversion, in seq_num order."""
+    result = {cid: [] for cid in conversion_ids}
+    if not conversion_ids:
+        return result
+    with DB_LOCK:
+        conn = get_connection()
+        try:
+            placeholders = ",".join("?" * len(conversion_ids))
+            rows = conn.execute(f"""
+                SELECT id, conversion_id, text FROM chunks
+                WHERE conversion_id IN ({placeholders}) AND status IN ('pending', 'error')
+                ORDER BY conversion_id, seq_num ASC
+            """, conversion_ids).fetchall()
+        finally:
+            conn.close()
+    for row in rows:
+        result[row["conversion_id"]].append((row["id"], row["text"]))
+    return result
+
+def get_rate_stats() -> list[dict]:
+    """Per (provider, speaker, language) totals over finished chunks, for the speaking-rate model."""
+    with DB_LOCK:
+        conn = get_connection()
+        rows = conn.execute("""
+            SELECT c.provider, c.speaker, c.language,
+                   SUM(LENGTH(ch.text)) AS chars,
+                   SUM(ch.duration) AS duration,
+                   SUM(CASE WHEN ch.synth_seconds > 0 THEN LENGTH(ch.text) ELSE 0 END) AS synth_chars,
+                   SUM(ch.synth_seconds) AS synth_seconds
+            FROM chunks ch
+            JOIN conversions c ON c.id = ch.conversion_id
+            WHERE ch.status = 'done' AND ch.duration > 0
+            GROUP BY c.provider, c.speaker, c.language
+        """).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+def get_remaining_chars() -> dict:
+    """
+    Characters not yet synthesized, per queued or processing conversion.
+    Chunks of interrupted or failed conversions wait for a retry, not a worker.
+    """
+    with DB_LOCK:
+        conn = get_connection()
+        rows = conn.execute("""
+            SELECT ch.conversion_id, SUM(LENGTH(ch.text)) AS chars
+            FROM chunks ch
+            JOIN conversions c ON c.id = ch.conversion_id
+            WHERE ch.status IN ('pending', 'processing') AND c.status IN ('queued', 'processing')
+            GROUP BY ch.conversion_id
+        """).fetchall()
+        conn.close()
+        return {row["conversion_id"]: row["chars"] or 0 for row in rows}
+
+def get_backlog_chars() -> dict:
+    """Characters still waiting for synthesis, per provider."""
+    with DB_LOCK:
+        conn = get_connection()
+        rows = conn.execute("""
+            SELECT c.provider, SUM(LENGTH(ch.text)) AS chars
+            FROM chunks ch
+            JOIN conversions c ON c.id = ch.conversion_id
+            WHERE ch.status IN ('pending', 'processing') AND c.status IN ('queued', 'processing')
+            GROUP BY c.provider
+        """).fetchall()
+        conn.close()
+        return {row["provider"]: row["chars"] or 0 for row in rows}
+
 def update_conversion_progress(conversion_id: str, last_played_index: int):
     with DB_LOCK:
         conn = get_connection()
@@ -216,11 +557,24 @@ def update_conversion_progress(conversion_id: str, last_played_index: int):
         conn.commit()
         conn.close()
 
+def update_export_status(conversion_id: str, status: str, progress: float):
+    """Audiobook export state: 'building', 'ready' or 'error', progress 0..1."""
+    with DB_LOCK:
+        conn = get_connection()
+        conn.execute("UPDATE conversions SET export_status = ?, export_progress = ? WHERE id = ?", (status, progress, conversion_id))
+        conn.commit()
+        conn.close()
+
 
 def update_conversion_title(conversion_id: str, new_title: str):
     with DB_LOCK:
         conn = get_connection()
         conn.execute("UPDATE conversions SET title = ? WHERE id = ?", (new_title, conversion_id))
+        if FTS_ENABLED:
+            conn.execute("""
+                UPDATE conversions_fts SET title = ?
+                WHERE rowid = (SELECT rowid FROM conversion_search_ids WHERE conversion_id = ?)
+            """, (new_title, conversion_id))
         conn.commit()
         conn.close()
 
@@ -228,12 +582,94 @@ def delete_conversion(conversion_id: str):
     with DB_LOCK:
         conn = get_connection()
         try:
+            _unindex_conversion(conn, conversion_id)
             conn.execute("DELETE FROM chunks WHERE conversion_id = ?", (conversion_id,))
             conn.execute("DELETE FROM conversions WHERE id = ?", (conversion_id,))
             conn.commit()
         finally:
             conn.close()
 
+def _fts_query(query: str) -> str:
+    """Turn free text into an FTS5 query: all terms required, last one as prefix."""
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return ""
+    quoted = ['"' + t + '"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def search(query: str, limit: int = 20, matches_per_conversion: int = 10) -> list[dict]:
+    """
+    Full-text search over conversion titles/texts and chunk texts.
+    Returns ranked conversions, each with the matching chunks (seq_num order).
+    """
+    with DB_LOCK:
+        conn = get_connection()
+        try:
+            if FTS_ENABLED:
+                fts = _fts_query(query)
+                if not fts:
+                    return []
+                # Title hits weigh more than body hits
+                conv_rows = conn.execute("""
+                    SELECT c.id, c.title, c.created_at, c.status, c.total_chunks,
+                           snippet(conversions_fts, 1, '[', ']', '…', 12) AS snippet
+                    FROM conversions_fts
+                    JOIN conversion_search_ids s ON s.rowid = conversions_fts.rowid
+                    JOIN conversions c ON c.id = s.conversion_id
+                    WHERE conversions_fts MATCH ?
+                    ORDER BY bm25(conversions_fts, 10.0, 1.0)
+                    LIMIT ?
+                """, (fts, limit)).fetchall()
+                ids = [r["id"] for r in conv_rows]
+                chunk_rows = []
+                if ids:
+                    placeholders = ",".join("?" * len(ids))
+                    # The MATCH runs once as an uncorrelated subquery; probing
+                    # chunks_fts per rowid re-evaluates the whole query each time
+                    chunk_rows = conn.execute(f"""
+                        SELECT id, conversion_id, seq_num, text, status
+                        FROM chunks
+                        WHERE conversion_id IN ({placeholders})
+                          AND id IN (SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ?)
+                        ORDER BY seq_num ASC
+                    """, (*ids, fts)).fetchall()
+            else:
+                like = f"%{query.strip()}%"
+                if like == "%%":
+                    return []
+                conv_rows = conn.execute("""
+                    SELECT id, title, created_at, status, total_chunks, NULL AS snippet
+                    FROM conversions
+                    WHERE title LIKE ? OR text LIKE ?
+                    ORDER BY (title LIKE ?) DESC, created_at DESC
+                    LIMIT ?
+                """, (like, like, like, limit)).fetchall()
+                ids = [r["id"] for r in conv_rows]
+                chunk_rows = []
+                if ids:
+                    placeholders = ",".join("?" * len(ids))
+                    chunk_rows = conn.execute(f"""
+                        SELECT id, conversion_id, seq_num, text, status FROM chunks
+                        WHERE text LIKE ? AND conversion_id IN ({placeholders})
+                        ORDER BY seq_num ASC
+                    """, (like, *ids)).fetchall()
+        finally:
+            conn.close()
+
+    results = []
+    by_id = {}
+    for r in conv_rows:
+        item = dict(r)
+        item["matches"] = []
+        by_id[item["id"]] = item
+        results.append(item)
+    for ch in chunk_rows:
+        item = by_id[ch["conversion_id"]]
+        if len(item["matches"]) < matches_per_conversion:
+            item["matches"].append(dict(ch))
+    return results
+
 def get_provider_settings(provider_id: str) -> dict:
     with DB_LOCK:
         conn = get_connection()
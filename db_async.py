@@ -0,0 +1,90 @@
+# db_async.py
+#
+# Non-blocking read access for the async endpoints in asgi.py.
+# Queries mirror their counterparts in db.py but skip DB_LOCK: the database
+# runs in WAL mode, so these read-only connections see the last committed
+# state without waiting for, or holding up, the synthesis workers' writes.
+
+import asyncio
+
+import aiosqlite
+
+import db
+from config import ASYNC_DB_READERS
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def _connect():
+    conn = await aiosqlite.connect(db.DB_FILE)
+    conn.row_factory = aiosqlite.Row
+    await conn.execute("PRAGMA query_only = ON")
+    await conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+
+async def _acquire():
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            _pool = asyncio.Queue()
+            for _ in range(ASYNC_DB_READERS):
+                _pool.put_nowait(await _connect())
+    return await _pool.get()
+
+
+async def close():
+    global _pool
+    if _pool is None:
+        return
+    while not _pool.empty():
+        await _pool.get_nowait().close()
+    _pool = None
+
+
+async def _fetchall(sql: str, params: tuple = ()) -> list:
+    conn = await _acquire()
+    try:
+        async with conn.execute(sql, params) as cursor:
+            return await cursor.fetchall()
+    finally:
+        _pool.put_nowait(conn)
+
+
+async def get_all_conversions():
+    rows = await _fetchall("SELECT * FROM conversions ORDER BY created_at DESC")
+    return [dict(row) for row in rows]
+
+
+async def get_conversion_with_chunks(conversion_id: str):
+    """Returns dict with conversion info + list of chunks."""
+    conn = await _acquire()
+    try:
+        # One read transaction, so the chunks match the conversion row
+        await conn.execute("BEGIN")
+        async with conn.execute("SELECT * FROM conversions WHERE id = ?", (conversion_id,)) as cursor:
+            conv = await cursor.fetchone()
+        if not conv:
+            return None
+        async with conn.execute("SELECT * FROM chunks WHERE conversion_id = ? ORDER BY seq_num ASC", (conversion_id,)) as cursor:
+            chunks = await cursor.fetchall()
+    finally:
+        await conn.rollback()
+        _pool.put_nowait(conn)
+
+    result = dict(conv)
+    result["chunks"] = [dict(c) for c in chunks]
+    return result
+
+
+async def get_remaining_chars() -> dict:
+    """Characters not yet synthesized, per queued or processing conversion (as db.get_remaining_chars)."""
+    rows = await _fetchall("""
+        SELECT ch.conversion_id, SUM(LENGTH(ch.text)) AS chars
+        FROM chunks ch
+        JOIN conversions c ON c.id = ch.conversion_id
+        WHERE ch.status IN ('pending', 'processing') AND c.status IN ('queued', 'processing')
+        GROUP BY ch.conversion_id
+    """)
+    return {row["conversion_id"]: row["chars"] or 0 for row in rows}
@@ -0,0 +1,105 @@
+# peaks.py
+#
+# Downsampled waveform peaks, stored next to each chunk as int8 (min, max)
+# pairs at PEAKS_PER_SECOND and concatenated per conversion into peaks.bin.
+
+import os
+
+import numpy as np
+import soundfile as sf
+
+from config import PEAKS_PER_SECOND
+
+CONVERSION_PEAKS_FILE = "peaks.bin"
+
+
+def peaks_path(audio_path: str) -> str:
+    return os.path.splitext(audio_path)[0] + ".peaks"
+
+
+def compute_peaks(audio: np.ndarray, sr: int, peaks_per_second: int = PEAKS_PER_SECOND) -> np.ndarray:
+    """Interleaved int8 [min0, max0, min1, max1, ...] per bucket of 1/peaks_per_second s."""
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if audio.size == 0:
+        return np.zeros(0, dtype=np.int8)
+
+    bucket = max(1, int(round(sr / peaks_per_second)))
+    buckets = -(-audio.size // bucket)
+    # Pad the last bucket with its own edge value so it does not fake a zero crossing
+    padded = np.pad(audio, (0, buckets * bucket - audio.size), mode="edge").reshape(buckets, bucket)
+
+    pairs = np.empty((buckets, 2), dtype=np.float32)
+    pairs[:, 0] = padded.min(axis=1)
+    pairs[:, 1] = padded.max(axis=1)
+    return np.clip(np.round(pairs * 127), -127, 127).astype(np.int8).ravel()
+
+
+def write_chunk_peaks(audio_path: str, audio: np.ndarray = None, sr: int = None) -> np.ndarray:
+    """Compute and store the peaks of one chunk; reads the file unless audio is given."""
+    if audio is None:
+        audio, sr = sf.read(audio_path, dtype="float32", always_2d=False)
+    peaks = compute_peaks(audio, sr)
+    peaks.tofile(peaks_path(audio_path))
+    return peaks
+
+
+def load_chunk_peaks(audio_path: str) -> np.ndarray:
+    path = peaks_path(audio_path)
+    if os.path.exists(path):
+        return np.fromfile(path, dtype=np.int8)
+    # Chunks written before peaks existed
+    return write_chunk_peaks(audio_path)
+
+
+def invalidate_conversion_peaks(job_dir: str):
+    path = os.path.join(job_dir, CONVERSION_PEAKS_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def load_conversion_peaks(job_dir: str, segments: list[tuple[str, float]], cache: bool = True) -> np.ndarray:
+    """
+    Peaks of a conversion in chunk order, cached in peaks.bin when `cache`.
+    segments are (audio_path, seconds) per chunk in seq_num order; chunks
+    without audio (path None) become that many seconds of zero pairs, so
+    later chunks keep their place on the timeline.
+    Each chunk ends at pair round(start + seconds) of the running total, so
+    the partial last bucket of every chunk does not add up over thousands.
+    """
+    path = os.path.join(job_dir, CONVERSION_PEAKS_FILE)
+    if cache and os.path.exists(path):
+        return np.fromfile(path, dtype=np.int8)
+
+    parts = []
+    pairs = 0
+    elapsed = 0.0
+    for audio_path, seconds in segments:
+        elapsed += seconds
+        count = max(0, int(round(elapsed * PEAKS_PER_SECOND)) - pairs)
+        part = np.zeros((count, 2), dtype=np.int8)
+        if audio_path and os.path.exists(audio_path):
+            chunk = load_chunk_peaks(audio_path).reshape(-1, 2)[:count]
+            part[:len(chunk)] = chunk
+        parts.append(part.ravel())
+        pairs += count
+    peaks = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int8)
+    if cache:
+        tmp = path + ".tmp"
+        peaks.tofile(tmp)
+        os.replace(tmp, path)
+    return peaks
+
+
+def downsample_peaks(peaks: np.ndarray, width: int) -> np.ndarray:
+    """Reduce interleaved peaks to at most `width` (min, max) pairs."""
+    pairs = peaks.reshape(-1, 2)
+    if width <= 0 or len(pairs) <= width:
+        return peaks
+    group = -(-len(pairs) // width)
+    groups = -(-len(pairs) // group)
+    padded = np.pad(pairs, ((0, groups * group - len(pairs)), (0, 0)), mode="edge").reshape(groups, group, 2)
+    out = np.empty((groups, 2), dtype=np.int8)
+    out[:, 0] = padded[:, :, 0].min(axis=1)
+    out[:, 1] = padded[:, :, 1].max(axis=1)
+    return out.ravel()
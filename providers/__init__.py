@@ -1,3 +1,5 @@
 from .base import TTSProvider
 from .local_xtts import LocalTTSProvider
 from .google_cloud import GoogleTTSProvider
+from .model_manager import ModelManager
+from .auto import AutoTTSProvider
@@ -0,0 +1,112 @@
+import threading
+from datetime import datetime
+
+import db
+from config import SPEAKERS, LANGUAGES, AUTO_MONTHLY_BUDGET_USD, GOOGLE_COST_PER_MILLION_CHARS
+from rate_model import RATE_MODEL
+from .base import TTSProvider
+
+
+class AutoTTSProvider(TTSProvider):
+    """
+    Picks local XTTS or Google per conversion: whichever is predicted to
+    finish first, given each provider's queued characters and its synthesis
+    rate from the speaking-rate model, as long as Google stays within the
+    monthly budget.
+    Voices and languages are the XTTS ones and are mapped when routing to Google.
+    """
+
+    def __init__(self, local: TTSProvider, google: TTSProvider):
+        self._local = local
+        self._google = google
+        self._lock = threading.Lock()
+
+    def get_voices(self, language: str = None) -> list[str]:
+        return SPEAKERS
+
+    def get_languages(self) -> list[str]:
+        return LANGUAGES
+
+    def record_usage(self, provider_id: str, chars: int):
+        """Count a finished chunk towards the Google spend."""
+        if provider_id == "google":
+            self._add_google_usage(chars)
+
+    def _usage(self) -> dict:
+        month = datetime.now().strftime("%Y-%m")
+        usage = db.get_provider_settings("auto_usage")
+        if usage.get("month") != month:
+            usage = {"month": month, "google_chars": 0}
+        return usage
+
+    def _add_google_usage(self, chars: int):
+        with self._lock:
+            usage = self._usage()
+            usage["google_chars"] += chars
+            db.save_provider_settings("auto_usage", usage)
+
+    def _budget_usd(self) -> float:
+        settings = db.get_provider_settings("auto")
+        try:
+            return float(settings.get("budget_usd", AUTO_MONTHLY_BUDGET_USD))
+        except (TypeError, ValueError):
+            return AUTO_MONTHLY_BUDGET_USD
+
+    def predict(self, chars: int, speaker: str, language: str) -> dict:
+        """Predicted completion time of both routes and the chosen one."""
+        backlog = db.get_backlog_chars()
+        budget = self._budget_usd()
+        spent = self._usage()["google_chars"] * GOOGLE_COST_PER_MILLION_CHARS / 1e6
+        cost = chars * GOOGLE_COST_PER_MILLION_CHARS / 1e6
+        within_budget = spent + cost <= budget
+
+        # Google rates are recorded under the mapped voice and language code
+        mapped = None
+        if within_budget and self._google.is_configured():
+            mapped = self._google.map_voice(speaker, language)
+        google_voice, google_language = mapped if mapped else (None, None)
+
+        def eta(provider_id, voice, lang):
+            queued = backlog.get(provider_id, 0)
+            # The backlog mixes voices, so it is priced at the provider's overall rate
+            seconds = (RATE_MODEL.estimate_synthesis(queued, provider_id, None, None)
+                       + RATE_MODEL.estimate_synthesis(chars, provider_id, voice, lang))
+            return seconds, queued, RATE_MODEL.synth_seconds_per_char(provider_id, voice, lang)
+
+        local_eta, local_queued, local_rate = eta("local", speaker, language)
+        google_eta, google_queued, google_rate = eta("google", google_voice, google_language)
+
+        choice = "google" if mapped and google_eta < local_eta else "local"
+        return {
+            "choice": choice,
+            "chars": chars,
+            "local": {
+                "eta_seconds": round(local_eta, 1),
+                "queued_chars": local_queued,
+                "synth_seconds_per_char": round(local_rate, 5),
+            },
+            "google": {
+                "eta_seconds": round(google_eta, 1),
+                "queued_chars": google_queued,
+                "synth_seconds_per_char": round(google_rate, 5),
+                "cost_usd": round(cost, 4),
+                "within_budget": within_budget,
+                "voice": google_voice,
+                "language": google_language,
+            },
+            "budget_usd": budget,
+            "spent_usd": round(spent, 4),
+        }
+
+    def route(self, chars: int, speaker: str, language: str):
+        """Returns (provider_id, voice, language, prediction)."""
+        prediction = self.predict(chars, speaker, language)
+        if prediction["choice"] == "google":
+            g = prediction["google"]
+            return "google", g["voice"], g["language"], prediction
+        return "local", speaker, language, prediction
+
+    def synthesize(self, text: str, voice: str, language: str, output_path: str, use_cuda: bool = True):
+        provider_id, voice, language, _ = self.route(len(text), voice, language)
+        provider = self._google if provider_id == "google" else self._local
+        provider.synthesize(text=text, voice=voice, language=language, output_path=output_path, use_cuda=use_cuda)
@@ -1,6 +1,7 @@
 import os
 from google.cloud import texttospeech
 import db
+from config import FEMALE_SPEAKERS, GOOGLE_LANGUAGE_CODES, GOOGLE_VOICE_TIER
 from .base import TTSProvider
 
 class GoogleTTSProvider(TTSProvider):
@@ -8,6 +9,7 @@ class GoogleTTSProvider(TTSProvider):
         self._client = None
         self._voice_cache = None
         self._lang_cache = None
+        self._voices_by_language = {}
 
     def _get_client(self):
         if self._client is None:
@@ -52,6 +54,39 @@ class GoogleTTSProvider(TTSProvider):
                 return ["en-US"] # Fallback
         return self._lang_cache
 
+    def is_configured(self) -> bool:
+        settings = db.get_provider_settings("google")
+        return bool(settings.get("google_service_account") or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"))
+
+    def map_voice(self, speaker: str, language: str):
+        """
+        Pick a Google voice for an XTTS speaker and language code.
+        Matches the speaker's gender and spreads speakers over the available voices.
+        Returns (voice_name, google_language_code) or None.
+        """
+        language_code = GOOGLE_LANGUAGE_CODES.get(language, language)
+        if language_code not in self._voices_by_language:
+            try:
+                client = self._get_client()
+                voices = client.list_voices(language_code=language_code).voices
+                self._voices_by_language[language_code] = sorted(
+                    (v.name, texttospeech.SsmlVoiceGender(v.ssml_gender).name) for v in voices
+                )
+            except Exception as e:
+                print(f"[ERROR] Failed to list Google voices for {language_code}: {e}")
+                return None
+
+        voices = self._voices_by_language[language_code]
+        gender = "FEMALE" if speaker in FEMALE_SPEAKERS else "MALE"
+        candidates = [name for name, g in voices if g == gender] or [name for name, _ in voices]
+        preferred = [name for name in candidates if GOOGLE_VOICE_TIER in name]
+        candidates = preferred or candidates
+        if not candidates:
+            return None
+        # Stable across runs, unlike hash()
+        index = sum(ord(ch) for ch in speaker) % len(candidates)
+        return candidates[index], language_code
+
     def synthesize(self, text: str, voice: str, language: str, output_path: str, use_cuda: bool = True):
         client = self._get_client()
         synthesis_input = texttospeech.SynthesisInput(text=text)
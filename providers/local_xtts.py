@@ -1,28 +1,19 @@
 from TTS.api import TTS
 from config import MODEL_NAME, SPEAKERS, LANGUAGES
 from .base import TTSProvider
+from .model_manager import ModelManager
+
+
+def _load_tts(name: str, device: str) -> TTS:
+    tts = TTS(name)
+    tts.to(device)
+    return tts
+
 
 class LocalTTSProvider(TTSProvider):
     def __init__(self):
-        self._tts_gpu = None
-        self._tts_cpu = None
-
-    def _get_tts(self, use_cuda: bool) -> TTS:
-        if use_cuda:
-            if self._tts_gpu is None:
-                print("[INFO] Loading XTTS model for GPU…")
-                self._tts_gpu = TTS(MODEL_NAME)
-                try:
-                    self._tts_gpu.to("cuda")
-                except Exception as e:
-                    print(f"[WARN] Failed to move model to CUDA: {e}")
-            return self._tts_gpu
-        else:
-            if self._tts_cpu is None:
-                print("[INFO] Loading XTTS model for CPU…")
-                self._tts_cpu = TTS(MODEL_NAME)
-                self._tts_cpu.to("cpu")
-            return self._tts_cpu
+        # GPU and CPU requests share one instance when CUDA is unavailable
+        self.models = ModelManager(_load_tts)
 
     def get_voices(self, language: str = None) -> list[str]:
         return SPEAKERS
@@ -31,10 +22,10 @@ class LocalTTSProvider(TTSProvider):
         return LANGUAGES
 
     def synthesize(self, text: str, voice: str, language: str, output_path: str, use_cuda: bool = True):
-        tts = self._get_tts(use_cuda)
-        tts.tts_to_file(
-            text=text,
-            file_path=output_path,
-            speaker=voice,
-            language=language,
-        )
+        with self.models.acquire(MODEL_NAME, use_cuda) as tts:
+            tts.tts_to_file(
+                text=text,
+                file_path=output_path,
+                speaker=voice,
+                language=language,
+            )
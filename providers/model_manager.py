@@ -0,0 +1,241 @@
+import gc
+import threading
+import time
+from contextlib import contextmanager
+
+from config import MODEL_MEMORY_BUDGET_MB, MODEL_VRAM_BUDGET_MB, MODEL_IDLE_TIMEOUT, MODEL_SIZE_ESTIMATE_MB
+
+
+def resolve_device(use_cuda: bool) -> str:
+    """Return the device a model will actually run on."""
+    if not use_cuda:
+        return "cpu"
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+    except Exception:
+        pass
+    return "cpu"
+
+
+def _model_size_mb(model) -> float:
+    """Best-effort size of a loaded model's weights in MB."""
+    try:
+        import torch
+        modules = [m for m in vars(model).values() if isinstance(m, torch.nn.Module)]
+        if isinstance(model, torch.nn.Module):
+            modules.append(model)
+        total = 0
+        for module in modules:
+            for p in module.parameters():
+                total += p.numel() * p.element_size()
+            for b in module.buffers():
+                total += b.numel() * b.element_size()
+        if total:
+            return total / (1024 * 1024)
+    except Exception:
+        pass
+    return float(MODEL_SIZE_ESTIMATE_MB)
+
+
+class _Entry:
+    def __init__(self, size_mb: float):
+        # model is None while it is being loaded; size_mb is then an estimate
+        self.model = None
+        self.size_mb = size_mb
+        self.load_seconds = 0.0
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+
+class ModelManager:
+    """
+    Keeps loaded models keyed by (name, resolved device).
+    Requests that resolve to the same device share one instance. Idle models
+    are unloaded after `idle_timeout` seconds. Each device has its own budget,
+    host RAM (`budget_mb`) for CPU models and GPU memory (`vram_budget_mb`)
+    for CUDA ones: least recently used idle models are evicted to make room,
+    a load that only fits once an in-use model is released waits for it, and
+    a model larger than the whole budget is refused.
+    """
+
+    def __init__(self, loader, budget_mb: float = MODEL_MEMORY_BUDGET_MB, idle_timeout: float = MODEL_IDLE_TIMEOUT,
+                 vram_budget_mb: float = MODEL_VRAM_BUDGET_MB):
+        # loader(name, device) -> model
+        self._loader = loader
+        self._budgets = {"cpu": budget_mb, "cuda": vram_budget_mb}
+        self._idle_timeout = idle_timeout
+        self._entries = {}
+        # Last measured size per model name, kept after unloading
+        self._sizes = {}
+        # Guards the entries; notified whenever a model is released, loaded or unloaded.
+        # Never held while a model loads, so stats() and the reaper stay responsive.
+        self._cond = threading.Condition()
+        self._load_count = 0
+        self._last_load_seconds = 0.0
+        self._reaper = None
+
+    def _start_reaper(self):
+        if self._reaper is None and self._idle_timeout and self._idle_timeout > 0:
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, min(30.0, self._idle_timeout / 4))
+        while True:
+            time.sleep(interval)
+            self.unload_idle()
+
+    def _loaded_mb(self, device: str = None) -> float:
+        return sum(e.size_mb for k, e in self._entries.items() if device is None or k[1] == device)
+
+    def _unload(self, key):
+        entry = self._entries.pop(key)
+        print(f"[INFO] Unloading model {key[0]} ({key[1]}, {entry.size_mb:.0f} MB)")
+        entry.model = None
+        gc.collect()
+        if key[1] == "cuda":
+            try:
+                import torch
+                torch.cuda.empty_cache()
+            except Exception:
+                pass
+        self._cond.notify_all()
+
+    def _make_room(self, device: str, needed_mb: float) -> bool:
+        """
+        Evict idle models on `device` (LRU first) until `needed_mb` fits its
+        budget. Returns False if it only fits once an in-use model is released.
+        """
+        budget = self._budgets.get(device) or 0
+        if budget <= 0:
+            return True
+        idle = sorted(
+            (k for k, e in self._entries.items() if k[1] == device and e.in_use == 0 and e.model is not None),
+            key=lambda k: self._entries[k].last_used,
+        )
+        for key in idle:
+            if self._loaded_mb(device) + needed_mb <= budget:
+                break
+            self._unload(key)
+        return self._loaded_mb(device) + needed_mb <= budget
+
+    def _check_budget(self, name: str, device: str, size_mb: float):
+        budget = self._budgets.get(device) or 0
+        if budget > 0 and size_mb > budget:
+            raise RuntimeError(
+                f"Model {name} needs {size_mb:.0f} MB, more than the {budget} MB {device} budget"
+            )
+
+    def _load(self, key) -> _Entry:
+        """Load the model for `key` outside the lock. Caller holds the condition."""
+        name, device = key
+        estimate = self._sizes.get(name, float(MODEL_SIZE_ESTIMATE_MB))
+        # Waiting would never help a model that cannot fit on its own
+        self._check_budget(name, device, estimate)
+        waited = False
+        while not self._make_room(device, estimate):
+            if not waited:
+                print(f"[INFO] Waiting for an in-use model to be released before loading {name} on {device}")
+                waited = True
+            self._cond.wait()
+            if key in self._entries:
+                # Loaded by another thread meanwhile
+                return self._entries[key]
+
+        # Reserve the slot so other threads wait for this load instead of repeating it
+        entry = _Entry(estimate)
+        self._entries[key] = entry
+        self._cond.release()
+        try:
+            print(f"[INFO] Loading model {name} on {device}…")
+            start = time.perf_counter()
+            model = self._loader(name, device)
+            elapsed = time.perf_counter() - start
+            size_mb = _model_size_mb(model)
+        except BaseException:
+            self._cond.acquire()
+            self._entries.pop(key, None)
+            self._cond.notify_all()
+            raise
+        self._cond.acquire()
+        self._sizes[name] = size_mb
+        entry.size_mb = size_mb
+        if not self._make_room(device, 0):
+            # Measured larger than estimated and over budget: drop it rather than run over
+            entry.model, model = model, None
+            self._unload(key)
+            self._check_budget(name, device, size_mb)
+            raise RuntimeError(f"Model {name} needs {size_mb:.0f} MB, which does not fit the {device} budget next to the models in use")
+        entry.model = model
+        entry.load_seconds = elapsed
+        self._load_count += 1
+        self._last_load_seconds = elapsed
+        print(f"[INFO] Loaded {name} on {device} in {elapsed:.1f}s ({size_mb:.0f} MB)")
+        self._start_reaper()
+        self._cond.notify_all()
+        return entry
+
+    @contextmanager
+    def acquire(self, name: str, use_cuda: bool):
+        """Yield a loaded model, loading it on demand. It is not unloaded while held."""
+        device = resolve_device(use_cuda)
+        key = (name, device)
+        with self._cond:
+            while True:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._load(key)
+                if entry.model is not None:
+                    break
+                # Another thread is loading it
+                self._cond.wait()
+            entry.in_use += 1
+        try:
+            yield entry.model
+        finally:
+            with self._cond:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+                self._cond.notify_all()
+
+    def unload_idle(self):
+        if not self._idle_timeout or self._idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        with self._cond:
+            for key, entry in list(self._entries.items()):
+                if entry.in_use == 0 and entry.model is not None and now - entry.last_used >= self._idle_timeout:
+                    self._unload(key)
+
+    def unload_all(self):
+        with self._cond:
+            for key, entry in list(self._entries.items()):
+                if entry.in_use == 0 and entry.model is not None:
+                    self._unload(key)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "budget_mb": self._budgets["cpu"],
+                "vram_budget_mb": self._budgets["cuda"],
+                "idle_timeout": self._idle_timeout,
+                "loaded_mb": round(self._loaded_mb("cpu"), 1),
+                "loaded_vram_mb": round(self._loaded_mb("cuda"), 1),
+                "load_count": self._load_count,
+                "last_load_seconds": round(self._last_load_seconds, 2),
+                "models": [
+                    {
+                        "name": name,
+                        "device": device,
+                        "size_mb": round(e.size_mb, 1),
+                        "load_seconds": round(e.load_seconds, 2),
+                        "in_use": e.in_use,
+                        "loading": e.model is None,
+                        "idle_seconds": round(now - e.last_used, 1),
+                    }
+                    for (name, device), e in self._entries.items()
+                ],
+            }
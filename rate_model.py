@@ -0,0 +1,113 @@
+# rate_model.py
+
+import threading
+
+import db
+from config import AUDIO_SECONDS_PER_CHAR, AUTO_DEFAULT_RTF
+
+# Pseudo-characters of prior weight; a voice needs about this much measured
+# text before its own rate outweighs the broader estimate it falls back to
+PRIOR_CHARS = 500
+
+
+class _Totals:
+    __slots__ = ("chars", "duration", "synth_chars", "synth_seconds")
+
+    def __init__(self):
+        self.chars = 0
+        self.duration = 0.0
+        self.synth_chars = 0
+        self.synth_seconds = 0.0
+
+
+class SpeakingRateModel:
+    """
+    Seconds of audio and of synthesis wall time per character, fitted from
+    finished chunks per (provider, voice, language).
+    Sparse keys shrink towards (provider, language), then provider, then the
+    config defaults. Loaded from the chunks table once, then updated as chunks finish.
+    """
+
+    def __init__(self):
+        self._totals = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._totals is not None:
+            return
+        totals = {}
+        for row in db.get_rate_stats():
+            self._add(totals, row["provider"], row["speaker"], row["language"],
+                      row["chars"] or 0, row["duration"] or 0.0,
+                      row["synth_chars"] or 0, row["synth_seconds"] or 0.0)
+        self._totals = totals
+
+    def preload(self):
+        """Read the chunks table now rather than on the first estimate."""
+        with self._lock:
+            self._ensure_loaded()
+
+    @staticmethod
+    def _add(totals, provider, voice, language, chars, duration, synth_chars, synth_seconds):
+        # Every level of the fallback hierarchy gets the same observation
+        for key in ((provider, voice, language), (provider, None, language), (provider, None, None)):
+            t = totals.setdefault(key, _Totals())
+            t.chars += chars
+            t.duration += duration
+            t.synth_chars += synth_chars
+            t.synth_seconds += synth_seconds
+
+    def observe(self, provider: str, voice: str, language: str, chars: int, duration: float, synth_seconds: float):
+        if chars <= 0 or duration <= 0:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            self._add(self._totals, provider, voice, language, chars, duration,
+                      chars if synth_seconds > 0 else 0, synth_seconds)
+
+    def _rates(self, provider: str, voice: str, language: str):
+        audio = AUDIO_SECONDS_PER_CHAR
+        synth = AUDIO_SECONDS_PER_CHAR * AUTO_DEFAULT_RTF.get(provider, 1.0)
+        with self._lock:
+            self._ensure_loaded()
+            # Without a voice or language some levels coincide; count each once
+            for key in dict.fromkeys(((provider, None, None), (provider, None, language), (provider, voice, language))):
+                t = self._totals.get(key)
+                if t is None:
+                    continue
+                audio = (t.duration + PRIOR_CHARS * audio) / (t.chars + PRIOR_CHARS)
+                synth = (t.synth_seconds + PRIOR_CHARS * synth) / (t.synth_chars + PRIOR_CHARS)
+        return audio, synth
+
+    def seconds_per_char(self, provider: str, voice: str, language: str) -> float:
+        return self._rates(provider, voice, language)[0]
+
+    def synth_seconds_per_char(self, provider: str, voice: str, language: str) -> float:
+        return self._rates(provider, voice, language)[1]
+
+    def estimate_duration(self, chars: int, provider: str, voice: str, language: str) -> float:
+        return chars * self.seconds_per_char(provider, voice, language)
+
+    def estimate_synthesis(self, chars: int, provider: str, voice: str, language: str) -> float:
+        return chars * self.synth_seconds_per_char(provider, voice, language)
+
+    def snapshot(self) -> list[dict]:
+        """Fitted rates per (provider, voice, language) key."""
+        with self._lock:
+            self._ensure_loaded()
+            keys = [k for k in self._totals if k[1] is not None]
+        result = []
+        for provider, voice, language in sorted(keys, key=lambda k: tuple(str(x) for x in k)):
+            audio, synth = self._rates(provider, voice, language)
+            result.append({
+                "provider": provider,
+                "voice": voice,
+                "language": language,
+                "chars": self._totals[(provider, voice, language)].chars,
+                "seconds_per_char": round(audio, 5),
+                "synth_seconds_per_char": round(synth, 5),
+            })
+        return result
+
+
+RATE_MODEL = SpeakingRateModel()
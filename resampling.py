@@ -0,0 +1,79 @@
+# resampling.py
+#
+# Sample rate conversion for chunk audio: nothing when the rate already
+# matches, soxr when installed, otherwise scipy's polyphase filter.
+# Converted chunks are cached on disk so repeated exports only read files.
+
+import os
+import shutil
+import tempfile
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+try:
+    import soxr
+except ImportError:
+    soxr = None
+
+CACHE_DIR = "resampled"
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Mono float32 audio at target_sr; returned unchanged if the rate matches."""
+    if orig_sr == target_sr or audio.size == 0:
+        return audio
+    if soxr is not None:
+        return soxr.resample(audio, orig_sr, target_sr, quality="HQ").astype(np.float32, copy=False)
+    g = gcd(orig_sr, target_sr)
+    return resample_poly(audio, target_sr // g, orig_sr // g).astype(np.float32, copy=False)
+
+
+def _read_mono(path: str):
+    audio, sr = sf.read(path, dtype="float32", always_2d=False)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    return audio, sr
+
+
+def cache_path(path: str, target_sr: int) -> str:
+    directory, name = os.path.split(path)
+    stem = os.path.splitext(name)[0]
+    return os.path.join(directory, CACHE_DIR, f"{stem}_{target_sr}.wav")
+
+
+def load_resampled(path: str, target_sr: int, use_cache: bool = True):
+    """
+    Load a chunk as mono float32 at target_sr. Converted audio is kept in a
+    resampled/ folder beside the chunk and reused while it is newer than the
+    chunk; callers that rename chunks must clear it (clear_cache).
+    """
+    cached = cache_path(path, target_sr)
+    if use_cache and os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(path):
+        audio, _ = _read_mono(cached)
+        return audio, target_sr
+
+    audio, sr = _read_mono(path)
+    if sr == target_sr:
+        return audio, sr
+
+    audio = resample(audio, sr, target_sr)
+    if use_cache:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        # Unique per writer: concurrent exports may convert the same chunk
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(cached))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # Float so the cache adds no quantization of its own
+                sf.write(f, audio, target_sr, subtype="FLOAT", format="WAV")
+            os.replace(tmp, cached)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    return audio, target_sr
+
+
+def clear_cache(job_dir: str):
+    shutil.rmtree(os.path.join(job_dir, CACHE_DIR), ignore_errors=True)
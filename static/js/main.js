@@ -10,6 +10,7 @@ let autoScrollEnabled = true;
 let totalLogicalSentences = 0;
 let lastRenderedDone = -1;
 let lastRenderedStatus = null;
+let exportRequested = false;
 
 // JOB_ID, FULL_TEXT, LAST_PLAYED_INDEX, MODE are defined in index.html
 
@@ -49,7 +50,32 @@ async function onProviderChange() {
     } catch (e) { console.error("Error fetching languages", e); }
 
     // 2. Automatically trigger voice fetch
-    onLanguageChange(defaultVoice);
+    await onLanguageChange(defaultVoice);
+    updateAutoPrediction();
+}
+
+async function updateAutoPrediction() {
+    const providerSelect = document.getElementById('provider');
+    const hint = document.getElementById('provider-hint');
+    if (!providerSelect || !hint) return;
+
+    if (providerSelect.value !== 'auto') {
+        hint.textContent = "Select the TTS engine to use.";
+        return;
+    }
+
+    const text = document.getElementById('text')?.value || "";
+    const speaker = document.getElementById('speaker')?.value || "";
+    const language = document.getElementById('language')?.value || "";
+    try {
+        const params = new URLSearchParams({ chars: text.length, speaker, language });
+        const res = await fetch(`/api/providers/auto/predict?${params}`);
+        if (!res.ok) return;
+        const p = await res.json();
+        const target = p.choice === 'google' ? 'Google Cloud' : 'Local (XTTS)';
+        hint.textContent = `Local ≈ ${formatDuration(p.local.eta_seconds)}, Google ≈ ${formatDuration(p.google.eta_seconds)}` +
+            ` ($${p.google.cost_usd.toFixed(2)}, $${p.spent_usd.toFixed(2)} of $${p.budget_usd.toFixed(2)} used) → ${target}`;
+    } catch (e) { console.error("Error fetching auto prediction", e); }
 }
 
 async function onLanguageChange(preferredVoice = null) {
@@ -219,6 +245,14 @@ async function loadProviderSettings() {
                         <div class="small-hint">You can create a service account and download the JSON key from the Google Cloud Console.</div>
                     </div>
                 `;
+            } else if (providerId === 'auto') {
+                fieldsDiv.innerHTML = `
+                    <div class="form-group">
+                        <label for="auto_budget_usd">Monthly Google budget (USD)</label>
+                        <input type="number" id="auto_budget_usd" min="0" step="0.5" value="${settings.budget_usd ?? 0}">
+                        <div class="small-hint">Auto routing only sends work to Google while this month's spend stays within the budget.</div>
+                    </div>
+                `;
             } else if (providerId === 'local') {
                 fieldsDiv.innerHTML = `<p style="color: #94a3b8;">No specific settings for local provider.</p>`;
             } else {
@@ -275,6 +309,9 @@ async function saveSettings() {
     if (providerId === 'google') {
         const field = document.getElementById('google_service_account');
         if (field) settings.google_service_account = field.value;
+    } else if (providerId === 'auto') {
+        const field = document.getElementById('auto_budget_usd');
+        if (field) settings.budget_usd = parseFloat(field.value) || 0;
     }
 
     settings.default_language = document.getElementById('settings-default-language').value;
@@ -785,6 +822,48 @@ function renderSegments() {
     updateSegmentStyles();
 }
 
+/**
+ * Draw the waveform of the generated audio behind the seek bar.
+ * Unfinished chunks come back as silence sized like their timeline
+ * segment, so finished audio is drawn under its own segment.
+ */
+async function loadWaveform() {
+    const canvas = document.getElementById("waveform-canvas");
+    const seekBar = document.getElementById("global-seek-bar");
+    if (!canvas || !seekBar || !JOB_ID) return;
+
+    const ratio = window.devicePixelRatio || 1;
+    const width = Math.max(1, Math.round(canvas.clientWidth * ratio));
+    const height = Math.max(1, Math.round(canvas.clientHeight * ratio));
+
+    try {
+        const res = await fetch(`/api/peaks/${JOB_ID}?width=${width}`);
+        if (!res.ok) return;
+        const peaks = new Int8Array(await res.arrayBuffer());
+        const perSecond = parseFloat(res.headers.get("X-Peaks-Per-Second")) || 0;
+        const displaySecs = parseFloat(seekBar.max || 0);
+
+        canvas.width = width;
+        canvas.height = height;
+        const ctx = canvas.getContext("2d");
+        ctx.clearRect(0, 0, width, height);
+        if (!perSecond || displaySecs <= 0) return;
+
+        const mid = height / 2;
+        const pxPerPair = width / (displaySecs * perSecond);
+        ctx.fillStyle = "#94a3b8";
+        for (let i = 0; i < peaks.length / 2; i++) {
+            const x = i * pxPerPair;
+            if (x >= width) break;
+            const top = mid - (peaks[2 * i + 1] / 127) * mid;
+            const bottom = mid - (peaks[2 * i] / 127) * mid;
+            ctx.fillRect(x, top, Math.max(1, pxPerPair), Math.max(1, bottom - top));
+        }
+    } catch (e) {
+        console.error("Error loading waveform:", e);
+    }
+}
+
 /**
  * Setup hover and mouse interaction for the seek bar once.
  */
@@ -912,6 +991,13 @@ async function pollStatus() {
         // Update Top Metadata
         if (metaStatus) metaStatus.textContent = data.status;
         if (metaProgress) metaProgress.textContent = `${data.done} / ${total} (${pct}%)`;
+
+        const metaSaved = document.getElementById("meta-saved");
+        if (metaSaved && data.seconds_saved > 0) {
+            const mb = (data.bytes_saved / (1024 * 1024)).toFixed(1);
+            document.getElementById("meta-saved-text").textContent = `${formatDuration(data.seconds_saved)} of silence, ${mb} MB`;
+            metaSaved.style.display = "";
+        }
         const metaProvider = document.getElementById("meta-provider-text");
         if (metaProvider) metaProvider.textContent = data.provider;
 
@@ -929,6 +1015,7 @@ async function pollStatus() {
             if (container.children.length !== activeSentences.length ||
                 statusChanged || doneIncreased) {
                 renderSegments();
+                if (doneIncreased || statusChanged) loadWaveform();
                 lastRenderedStatus = data.status;
                 lastRenderedDone = data.done || 0;
             }
@@ -949,7 +1036,7 @@ async function pollStatus() {
             }
 
             // Add/Update Class for color
-            sidebarLink.classList.remove("conv-item-queued", "conv-item-processing", "conv-item-done", "conv-item-converting");
+            sidebarLink.classList.remove("conv-item-queued", "conv-item-processing", "conv-item-done", "conv-item-converting", "conv-item-error");
             // Mapping status to class. If status is 'converting', use 'conv-item-converting'
             sidebarLink.classList.add(`conv-item-${data.status}`);
 
@@ -991,7 +1078,19 @@ async function pollStatus() {
             playFromIndex(currentIndex);
         }
 
+        const exp = data.export || {};
+        updateExportDisplay(exp);
+
         if (data.status === "done") {
+            // The audiobook finishes shortly after the last chunk; older
+            // conversions get it built on first view
+            if (!exp.status && !exportRequested) {
+                exportRequested = true;
+                fetch(`/api/export/${JOB_ID}`, { method: 'POST' })
+                    .then(r => { if (r.ok) setTimeout(pollStatus, 2000); });
+            } else if (exp.status === "building") {
+                setTimeout(pollStatus, 2000);
+            }
             if (metaDlLink) {
                 if (metaDlLink.getAttribute('href') === "#" || metaDlLink.style.display === "none") {
                     // Trigger generation to get path
@@ -1006,7 +1105,9 @@ async function pollStatus() {
                 }
             }
         } else if (data.status === "error") {
-            // handled above
+            // Some chunks failed after all retries; offer to re-run only those
+            const retryLink = document.getElementById("meta-retry-link");
+            if (retryLink) retryLink.style.display = "inline-block";
         } else {
             setTimeout(pollStatus, 1000);
         }
@@ -1015,6 +1116,29 @@ async function pollStatus() {
     }
 }
 
+function updateExportDisplay(exp) {
+    const link = document.getElementById("meta-audiobook-link");
+    const text = document.getElementById("meta-export-text");
+    if (!link || !text) return;
+
+    if (exp.status === "ready" && exp.url) {
+        link.href = exp.url;
+        link.style.display = "inline-block";
+        text.style.display = "none";
+    } else if (exp.status === "building") {
+        link.style.display = "none";
+        text.textContent = `Audiobook ${Math.floor((exp.progress || 0) * 100)}%`;
+        text.style.display = "inline";
+    } else if (exp.status === "error") {
+        link.style.display = "none";
+        text.textContent = "Audiobook export failed";
+        text.style.display = "inline";
+    } else {
+        link.style.display = "none";
+        text.style.display = "none";
+    }
+}
+
 async function init() {
     // 1. Load general settings first (for speed etc)
     try {
@@ -1037,10 +1161,19 @@ async function init() {
 
     // 2. Poll sidebar on all pages
     pollSidebar();
+    setupSearch();
 
     if (MODE !== 'view' || !JOB_ID || !FULL_TEXT) {
         if (MODE === 'new') {
             onProviderChange();
+            const textArea = document.getElementById('text');
+            let predictTimer = null;
+            if (textArea) {
+                textArea.addEventListener('input', () => {
+                    clearTimeout(predictTimer);
+                    predictTimer = setTimeout(updateAutoPrediction, 500);
+                });
+            }
         }
         return;
     }
@@ -1065,12 +1198,89 @@ async function init() {
         }
     }
 
+    // Opened from a search result: start at the matching sentence
+    if (typeof SEEK_INDEX !== 'undefined' && SEEK_INDEX >= 0 && SEEK_INDEX < totalLogicalSentences) {
+        currentIndex = SEEK_INDEX;
+        playedUntil = SEEK_INDEX - 1;
+        const el = document.querySelector(`.sentence[data-index="${SEEK_INDEX}"]`);
+        if (el) el.scrollIntoView({ block: "center" });
+    }
+
     updateSentenceStyles(totalLogicalSentences);
     setupControls();
 
     pollStatus();
 }
 
+let searchTimer = null;
+
+function setupSearch() {
+    const input = document.getElementById("sidebar-search");
+    if (!input) return;
+    input.addEventListener("input", () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => runSearch(input.value), 250);
+    });
+}
+
+async function runSearch(query) {
+    const list = document.getElementById("conversion-list");
+    const results = document.getElementById("search-results");
+    if (!list || !results) return;
+
+    if (!query.trim()) {
+        results.style.display = "none";
+        list.style.display = "";
+        return;
+    }
+
+    try {
+        const res = await fetch(`/api/search?q=${encodeURIComponent(query)}`);
+        if (!res.ok) return;
+        const data = await res.json();
+
+        results.innerHTML = "";
+        if (data.results.length === 0) {
+            results.innerHTML = '<li class="conversion-item"><span class="conversion-link">No matches</span></li>';
+        }
+        data.results.forEach(conv => {
+            const li = document.createElement("li");
+            li.className = "conversion-item";
+
+            const link = document.createElement("a");
+            link.className = "conversion-link";
+            link.href = conv.url;
+            const title = document.createElement("span");
+            title.className = "conv-title";
+            title.textContent = conv.title;
+            link.appendChild(title);
+            if (conv.snippet) {
+                const snippet = document.createElement("span");
+                snippet.className = "search-snippet";
+                snippet.textContent = conv.snippet;
+                link.appendChild(snippet);
+            }
+            li.appendChild(link);
+
+            // Jump straight to the matching sentence
+            conv.matches.forEach(m => {
+                const a = document.createElement("a");
+                a.className = "search-match";
+                a.href = m.url;
+                a.textContent = `#${m.seq_num + 1}: ${m.text}`;
+                li.appendChild(a);
+            });
+
+            results.appendChild(li);
+        });
+
+        list.style.display = "none";
+        results.style.display = "";
+    } catch (e) {
+        console.error("Search error", e);
+    }
+}
+
 async function pollSidebar() {
     try {
         const res = await fetch("/api/jobs/status");
@@ -1142,12 +1352,13 @@ function updateSidebarItem(job) {
             statusText.innerHTML = `<span class="conv-item-duration">-${formatDuration(rem)}</span>`;
         } else {
             // Processing / Queued
-            statusText.innerHTML = `<span class="status-indicator legend-dot ${job.status}"></span>${job.status} (${job.processed}/${job.total})`;
+            const eta = job.eta_seconds > 0 ? ` · ~${formatDuration(job.eta_seconds)} left` : "";
+            statusText.innerHTML = `<span class="status-indicator legend-dot ${job.status}"></span>${job.status} (${job.processed}/${job.total})${eta}`;
         }
     }
 
     // Update classes
-    link.classList.remove("conv-item-queued", "conv-item-processing", "conv-item-done", "conv-item-converting");
+    link.classList.remove("conv-item-queued", "conv-item-processing", "conv-item-done", "conv-item-converting", "conv-item-error");
     link.classList.add(`conv-item-${job.status}`);
 
     // Recalc playPct for bars
@@ -1309,6 +1520,25 @@ function deleteConversion(event, id) {
         });
 }
 
+function retryFailed(event, id) {
+    event.preventDefault();
+
+    fetch('/api/retry', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ conversion_id: id })
+    }).then(res => res.json())
+        .then(data => {
+            if (data.status === 'ok') {
+                const retryLink = document.getElementById("meta-retry-link");
+                if (retryLink) retryLink.style.display = "none";
+                pollStatus();
+            } else {
+                alert("Error retrying: " + (data.error || "Unknown"));
+            }
+        });
+}
+
 /* Inline Title Editing */
 function enableTitleEdit(event, id) {
     const heading = event.target;
@@ -1,21 +1,37 @@
+import difflib
+import glob
+import itertools
 import os
 import re
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import numpy as np
 import soundfile as sf
-import librosa
 
-from config import TARGET_SAMPLE_RATE
+from config import (
+    TARGET_SAMPLE_RATE, CHUNK_MAX_ATTEMPTS, CHUNK_RETRY_BACKOFF, JOB_PRIORITIES, PEAKS_PER_SECOND,
+    POSTPROCESS_ENABLED, POSTPROCESS_WORKERS, EXPORT_ENABLED,
+)
 import db
-from providers import LocalTTSProvider, GoogleTTSProvider
+from rate_model import RATE_MODEL
+from chunking import split_into_chunks, split_documents
+import peaks
+import audio_processing
+import resampling
+import audiobook
+from providers import LocalTTSProvider, GoogleTTSProvider, AutoTTSProvider
 
 class ProviderRegistry:
     def __init__(self):
+        local = LocalTTSProvider()
+        google = GoogleTTSProvider()
         self._providers = {
-            "local": LocalTTSProvider(),
-            "google": GoogleTTSProvider()
+            "local": local,
+            "google": google,
+            "auto": AutoTTSProvider(local, google)
         }
 
     def get_provider(self, provider_id: str) -> any:
@@ -24,47 +40,19 @@ class ProviderRegistry:
     def list_providers(self) -> list[dict]:
         return [
             {"id": "local", "name": "Local (XTTS)"},
-            {"id": "google", "name": "Google Cloud"}
+            {"id": "google", "name": "Google Cloud"},
+            {"id": "auto", "name": "Auto (fastest within budget)"}
         ]
 
-REGISTRY = ProviderRegistry()
-
-
-def split_into_chunks(text: str):
-    """
-    Split text into one sentence per chunk, respecting paragraphs.
-    Logic must match frontend `splitSentences` to align indices.
-    """
-    if not text:
-        return []
+    def record_usage(self, provider_id: str, chars: int):
+        self._providers["auto"].record_usage(provider_id, chars)
 
-    # 1. Split by double newlines (paragraphs)
-    paragraphs = re.split(r"\n\s*\n", text)
-    
-    all_chunks = []
-    
-    for para in paragraphs:
-        # Normalize whitespace in paragraph
-        clean_para = re.sub(r"\s+", " ", para).strip()
-        if not clean_para:
-            continue
-            
-        # Split by . ? !
-        sentences = re.split(r"(?<=[.!?])\s+", clean_para)
-        for s in sentences:
-            if s.strip():
-                all_chunks.append(s.strip())
-
-    return all_chunks
+REGISTRY = ProviderRegistry()
 
 
 def _normalize_wav(input_path: str, target_sr: int = TARGET_SAMPLE_RATE):
-    """Load audio, resample, mono, float32."""
-    audio, sr = librosa.load(input_path, sr=None, mono=True)
-    if sr != target_sr:
-        audio = librosa.resample(audio, orig_sr=sr, target_sr=target_sr)
-        sr = target_sr
-    return audio.astype(np.float32), sr
+    """Load audio, resample, mono, float32. Resampled chunks are cached."""
+    return resampling.load_resampled(input_path, target_sr)
 
 
 def _concat_wavs(input_files, output_file: str, target_sr: int = TARGET_SAMPLE_RATE):
@@ -82,17 +70,71 @@ def _concat_wavs(input_files, output_file: str, target_sr: int = TARGET_SAMPLE_R
     sf.write(output_file, final_audio, target_sr, subtype="PCM_16")
 
 
-# Job Queue
-JOB_QUEUE = None
+def _estimate_duration(chunks_text: list[str], provider: str, speaker: str, language: str) -> float:
+    chars = sum(len(c) for c in chunks_text)
+    return RATE_MODEL.estimate_duration(chars, provider, speaker, language)
 
-def _init_queue():
-    global JOB_QUEUE
-    if JOB_QUEUE is None:
-        import queue
-        JOB_QUEUE = queue.Queue()
-        # Start worker thread
-        thread = threading.Thread(target=_job_worker, daemon=True)
-        thread.start()
+
+def get_completion_estimates(conversions: list[dict], remaining: dict = None) -> dict:
+    """
+    Seconds until each unfinished conversion is fully synthesized.
+    Each provider works through its queue by priority, then submission
+    order, so a conversion also waits for the remaining work of those ahead.
+    `remaining` (chars per conversion) is read from the database if not given.
+    """
+    if remaining is None:
+        remaining = db.get_remaining_chars()
+    estimates = {}
+    queued_seconds = {}
+    for c in sorted(conversions, key=lambda c: (c.get("priority", JOB_PRIORITIES["normal"]), c["created_at"] or "")):
+        chars = remaining.get(c["id"], 0)
+        if not chars:
+            continue
+        provider = c.get("provider") or "local"
+        seconds = RATE_MODEL.estimate_synthesis(chars, provider, c.get("speaker"), c.get("language"))
+        queued_seconds[provider] = queued_seconds.get(provider, 0.0) + seconds
+        estimates[c["id"]] = queued_seconds[provider]
+    return estimates
+
+
+def _normalize_chunk_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# Job Queues, one worker per provider so a backed-up local queue never delays Google jobs.
+# Entries are (priority, sequence, job) so equal priorities stay first-in first-out.
+JOB_QUEUES = {}
+_QUEUES_LOCK = threading.Lock()
+_JOB_SEQUENCE = itertools.count()
+# Ids of chunks with a queue entry the worker has not reached yet, so edits
+# and retries do not queue the same chunk twice
+_QUEUED_CHUNKS = set()
+# Per conversion, held by a worker while a single chunk is synthesized, so edits see a stable chunk table
+_WORK_LOCKS = {}
+# Orders rebuilds of a conversion's peaks.bin against chunks finishing, so a
+# rebuild never caches a chunk list that is already out of date
+_PEAKS_LOCK = threading.Lock()
+# Trimming and normalization run here so the synthesis worker can move on to
+# the next chunk; threads, since NumPy and libsndfile release the GIL
+_POSTPROCESS_POOL = ThreadPoolExecutor(max_workers=POSTPROCESS_WORKERS, thread_name_prefix="postprocess")
+# Audiobook exports, one at a time in their own worker so encoding never
+# delays synthesis. Entries are (conversion_id, job_dir, retitle).
+_EXPORT_QUEUE = None
+_EXPORT_PENDING = set()
+
+def _get_queue(provider_id: str):
+    with _QUEUES_LOCK:
+        if provider_id not in JOB_QUEUES:
+            import queue
+            JOB_QUEUES[provider_id] = queue.PriorityQueue()
+            # Start worker thread
+            thread = threading.Thread(target=_job_worker, args=(JOB_QUEUES[provider_id],), daemon=True)
+            thread.start()
+        return JOB_QUEUES[provider_id]
+
+def _work_lock(conversion_id: str):
+    with _QUEUES_LOCK:
+        return _WORK_LOCKS.setdefault(conversion_id, threading.Lock())
 
 def start_job(
     title: str,
@@ -102,30 +144,117 @@ def start_job(
     provider: str,
     use_cuda: bool,
     static_folder: str,
+    priority: int = JOB_PRIORITIES["normal"],
 ) -> str:
     """
     Create a job, add to queue, return conversion_id.
     """
-    _init_queue()
-
     chunks_text = split_into_chunks(text)
-    
-    # Calculate estimated duration
-    # Avg reading speed ~ 150 words per minute => 2.5 words per second
-    words = len(text.split())
-    estimated_seconds = words / 2.5
+
+    if provider == "auto":
+        provider, speaker, language, prediction = REGISTRY.get_provider("auto").route(len(text), speaker, language)
+        print(f"[INFO] Auto routing to {provider}: local ETA {prediction['local']['eta_seconds']}s, "
+              f"Google ETA {prediction['google']['eta_seconds']}s")
+
+    estimated_seconds = _estimate_duration(chunks_text, provider, speaker, language)
     
     # Create DB entry
-    conversion_id = db.create_conversion(title, text, chunks_text, speaker=speaker, language=language, provider=provider, estimated_duration=estimated_seconds)
+    conversion_id = db.create_conversion(title, text, chunks_text, speaker=speaker, language=language, provider=provider, estimated_duration=estimated_seconds, priority=priority, use_cuda=use_cuda)
     
+    _enqueue_chunks(
+        conversion_id,
+        db.get_pending_chunks([conversion_id])[conversion_id],
+        speaker=speaker,
+        language=language,
+        provider=provider,
+        use_cuda=use_cuda,
+        static_folder=static_folder,
+        priority=priority,
+    )
+
+    return conversion_id
+
+def resolve_priority(priority) -> int:
+    """Accepts a JOB_PRIORITIES name or an integer; lower runs first."""
+    if priority is None:
+        return JOB_PRIORITIES["normal"]
+    if isinstance(priority, str) and priority in JOB_PRIORITIES:
+        return JOB_PRIORITIES[priority]
+    try:
+        return int(priority)
+    except (TypeError, ValueError):
+        raise ValueError(f"Unknown priority: {priority}")
+
+def start_jobs(
+    documents: list[dict],
+    speaker: str,
+    language: str,
+    provider: str,
+    use_cuda: bool,
+    static_folder: str,
+    priority: int = JOB_PRIORITIES["normal"],
+) -> list[str]:
+    """
+    Bulk variant of start_job. Each document has 'text' and optionally 'title'.
+    All conversions are created in one transaction and queued with `priority`.
+    Returns the conversion_ids in input order.
+    """
+    texts = [d["text"] for d in documents]
+    all_chunks = split_documents(texts)
+
+    if provider == "auto":
+        # One routing decision for the batch, based on its total size
+        provider, speaker, language, _ = REGISTRY.get_provider("auto").route(sum(len(t) for t in texts), speaker, language)
+        print(f"[INFO] Auto routing batch of {len(documents)} to {provider}")
+
+    stamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+    items = []
+    for i, (doc, chunks_text) in enumerate(zip(documents, all_chunks)):
+        items.append({
+            "title": doc.get("title") or f"Conversion {stamp} #{i + 1}",
+            "text": doc["text"],
+            "chunks": chunks_text,
+            "speaker": speaker,
+            "language": language,
+            "provider": provider,
+            "estimated_duration": _estimate_duration(chunks_text, provider, speaker, language),
+            "priority": priority,
+            "use_cuda": use_cuda,
+        })
+
+    conversion_ids = db.create_conversions(items)
+    pending = db.get_pending_chunks(conversion_ids)
+
+    for conversion_id in conversion_ids:
+        _enqueue_chunks(
+            conversion_id,
+            pending[conversion_id],
+            speaker=speaker,
+            language=language,
+            provider=provider,
+            use_cuda=use_cuda,
+            static_folder=static_folder,
+            priority=priority,
+        )
+
+    return conversion_ids
+
+def _enqueue_chunks(conversion_id: str, chunks: list, speaker: str, language: str, provider: str, use_cuda: bool, static_folder: str, priority: int = JOB_PRIORITIES["normal"]):
+    """
+    Queue (chunk_id, text) pairs of a conversion for synthesis. Chunks are
+    referred to by id, which edits keep while they renumber seq_num.
+    """
+    with _QUEUES_LOCK:
+        _QUEUED_CHUNKS.update(chunk_id for chunk_id, _ in chunks)
+
+    # The worker creates the directory when it starts on the job
     rel_job_dir = f"jobs/{conversion_id}"
     job_dir = os.path.join(static_folder, rel_job_dir)
-    os.makedirs(job_dir, exist_ok=True)
 
     # Add to queue
     job_data = {
         "conversion_id": conversion_id,
-        "chunks_text": chunks_text,
+        "chunks": chunks,
         "speaker": speaker,
         "language": language,
         "provider": provider,
@@ -133,25 +262,206 @@ def start_job(
         "job_dir": job_dir,
         "rel_job_dir": rel_job_dir
     }
-    JOB_QUEUE.put(job_data)
+    _get_queue(provider).put((priority, next(_JOB_SEQUENCE), job_data))
 
-    return conversion_id
+def _unqueued(chunks: list) -> list:
+    """The (chunk_id, text) pairs that no queue entry is still waiting to process."""
+    with _QUEUES_LOCK:
+        return [(chunk_id, text) for chunk_id, text in chunks if chunk_id not in _QUEUED_CHUNKS]
+
+def _stored_use_cuda(data: dict, use_cuda: bool = None) -> bool:
+    """use_cuda if given, else the device choice the conversion was submitted with."""
+    if use_cuda is not None:
+        return bool(use_cuda)
+    return data.get("use_cuda") != 0
 
-def _job_worker():
+def retry_job(conversion_id: str, static_folder: str, use_cuda: bool = None) -> int:
+    """
+    Re-enqueue only the 'error'/'pending' chunks of an existing conversion,
+    on the device it was submitted for unless use_cuda overrides it.
+    Returns the number of chunks queued.
+    """
+    data = db.get_conversion(conversion_id)
+    if not data:
+        raise ValueError("Conversion not found")
+    use_cuda = _stored_use_cuda(data, use_cuda)
+
+    chunks = _unqueued(db.reset_failed_chunks(conversion_id))
+    if chunks:
+        _enqueue_chunks(
+            conversion_id,
+            chunks,
+            speaker=data.get("speaker"),
+            language=data.get("language"),
+            provider=data.get("provider", "local"),
+            use_cuda=use_cuda,
+            static_folder=static_folder,
+            priority=data.get("priority", JOB_PRIORITIES["normal"]),
+        )
+    return len(chunks)
+
+def cleanup_interrupted(static_folder: str):
+    """
+    Remove synthesized chunks a previous run never got to post-process or
+    store. db.init_db has already put their chunks back to pending.
+    """
+    removed = 0
+    for path in glob.glob(os.path.join(static_folder, "jobs", "*", "raw_*.wav")):
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError as e:
+            print(f"[WARN] Could not remove {path}: {e}")
+    if removed:
+        print(f"[INFO] Removed {removed} unstored chunk files from an interrupted run")
+
+def _job_worker(job_queue):
     """Consumes jobs from the queue sequentially."""
     while True:
-        job = JOB_QUEUE.get()
+        _, _, job = job_queue.get()
         try:
             _process_job(job)
         except Exception as e:
             print(f"[ERROR] Worker exception: {e}")
         finally:
-            JOB_QUEUE.task_done()
+            job_queue.task_done()
+
+def _synthesize_with_retry(provider, text: str, output_path: str, voice: str, language: str, use_cuda: bool):
+    """Call provider.synthesize, retrying with exponential backoff."""
+    attempts = max(1, CHUNK_MAX_ATTEMPTS)
+    delay = CHUNK_RETRY_BACKOFF
+    for attempt in range(1, attempts + 1):
+        try:
+            provider.synthesize(
+                text=text,
+                output_path=output_path,
+                voice=voice,
+                language=language,
+                use_cuda=use_cuda
+            )
+            return
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            print(f"[WARN] Synthesis attempt {attempt}/{attempts} failed: {e}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+            delay *= 2
+
+
+def _process_chunk(provider_id: str, provider, conversion_id: str, chunk_id: int, chunk_text: str, speaker: str, language: str, use_cuda: bool, job_dir: str, rel_job_dir: str):
+    # The work lock covers claiming and storing only, so synthesis and retry
+    # backoff never hold up edits or the post-processing of earlier chunks
+    with _work_lock(conversion_id):
+        # Skip chunks finished by another queued job, replaced by an edit or
+        # removed with the conversion
+        chunk = db.get_chunk_by_id(chunk_id)
+        if not chunk or chunk["status"] not in ('pending', 'error') or chunk["text"] != chunk_text:
+            return
+        db.update_chunk_status(conversion_id, chunk["seq_num"], 'processing')
+    
+    # Synthesized under the chunk id; it becomes part_{seq}.wav once processed,
+    # by which time an edit may have renumbered the chunk
+    raw_path = os.path.join(job_dir, f"raw_{chunk['id']}.wav")
+    
+    try:
+        start = time.perf_counter()
+        _synthesize_with_retry(
+            provider,
+            text=chunk_text,
+            output_path=raw_path,
+            voice=speaker,
+            language=language,
+            use_cuda=use_cuda
+        )
+    except Exception as e:
+        with _work_lock(conversion_id):
+            current = _current_chunk(chunk, raw_path)
+            if current:
+                print(f"Error processing chunk {current['seq_num']}: {e}")
+                db.update_chunk_status(conversion_id, current["seq_num"], 'error')
+        return
+
+    synth_seconds = time.perf_counter() - start
+    REGISTRY.record_usage(provider_id, len(chunk_text))
+
+    args = (conversion_id, chunk, raw_path, job_dir, rel_job_dir, provider_id, speaker, language, synth_seconds)
+    if POSTPROCESS_ENABLED:
+        _POSTPROCESS_POOL.submit(_postprocess_chunk, *args)
+    else:
+        _finish_chunk(*args, processed=None)
+
+
+def _postprocess_chunk(conversion_id: str, chunk: dict, raw_path: str, *store_args):
+    try:
+        processed = audio_processing.process_file(raw_path)
+    except Exception as e:
+        print(f"[WARN] Post-processing failed for chunk {chunk['id']}: {e}; keeping it unprocessed")
+        processed = None
+    _finish_chunk(conversion_id, chunk, raw_path, *store_args, processed=processed)
+
+
+def _current_chunk(chunk: dict, raw_path: str):
+    """
+    Re-read a claimed chunk after synthesis, or None once an edit or delete
+    has dropped or changed it (its raw file is removed). Caller holds the work lock.
+    """
+    current = db.get_chunk_by_id(chunk["id"])
+    if not current or current["status"] != 'processing' or current["text"] != chunk["text"]:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+        return None
+    return current
+
+
+def _finish_chunk(conversion_id: str, chunk: dict, raw_path: str, *store_args, processed: dict = None):
+    with _work_lock(conversion_id):
+        current = _current_chunk(chunk, raw_path)
+        if not current:
+            return
+        try:
+            _store_chunk(conversion_id, current, raw_path, *store_args, processed=processed)
+        except Exception as e:
+            print(f"Error processing chunk {current['seq_num']}: {e}")
+            db.update_chunk_status(conversion_id, current["seq_num"], 'error')
+
+
+def _store_chunk(conversion_id: str, chunk: dict, raw_path: str, job_dir: str, rel_job_dir: str, provider_id: str, speaker: str, language: str, synth_seconds: float, processed: dict = None):
+    """Move a synthesized chunk into place and mark it done. Caller holds the work lock."""
+    idx = chunk["seq_num"]
+    filename = f"part_{idx}.wav"
+    part_path = os.path.join(job_dir, filename)
+
+    raw_bytes = os.path.getsize(raw_path)
+    if processed is not None:
+        audio, sr = processed["audio"], processed["sr"]
+        sf.write(part_path, audio, sr, subtype="PCM_16")
+        os.remove(raw_path)
+        trimmed_seconds = processed["raw_seconds"] - processed["seconds"]
+    else:
+        os.replace(raw_path, part_path)
+        audio, sr = sf.read(part_path, dtype="float32", always_2d=False)
+        trimmed_seconds = 0.0
+    duration = len(audio) / sr
+    saved_bytes = raw_bytes - os.path.getsize(part_path)
+
+    # Waveform peaks while the samples are loaded
+    peaks.write_chunk_peaks(part_path, audio, sr)
+    RATE_MODEL.observe(provider_id, speaker, language, len(chunk["text"]), duration, synth_seconds)
+
+    rel_path = f"{rel_job_dir}/{filename}"
+    db.update_chunk_status(
+        conversion_id, idx, 'done', audio_filename=rel_path, duration=duration,
+        synth_seconds=synth_seconds, trimmed_seconds=trimmed_seconds, saved_bytes=saved_bytes,
+    )
+    with _PEAKS_LOCK:
+        peaks.invalidate_conversion_peaks(job_dir)
+    _schedule_export(conversion_id, job_dir)
+
 
 def _process_job(job):
-    """Generate each sentence for the job."""
+    """Generate each queued sentence for the job."""
     conversion_id = job["conversion_id"]
-    chunks_text = job["chunks_text"]
+    chunks = job["chunks"]
     speaker = job["speaker"]
     language = job["language"]
     provider_id = job["provider"]
@@ -159,76 +469,246 @@ def _process_job(job):
     job_dir = job["job_dir"]
     rel_job_dir = job["rel_job_dir"]
 
-    # Mark conversion as processing (if not already handled by logic elsewhere, 
-    # but strictly speaking it might have been 'queued' for a while)
-    # The current db logic defaults to 'queued'.
-    # We should update it to 'processing' now.
-    # Note: db.py updates status implicitly when chunks are updated? 
-    # db.update_chunk_status updates the whole conversion status if all done.
-    # But strictly, we should set it to processing at start if we want correct UI status.
-    # However, existing logic didn't do this explicitly at start, it relied on implicit or stayed queued?
-    # Let's add an explicit update to processing.
-    # We need a db function for that or just update one chunk.
-    # Let's stick to existing flow to minimize side effects, 
-    # update_chunk_status(..., 'processing') below handles individual chunks.
-    # Ideally should update conversion status too.
-    
     try:
         provider = REGISTRY.get_provider(provider_id)
         if not provider:
             raise ValueError(f"Provider {provider_id} not found")
 
-        total = len(chunks_text)
-        if total == 0:
-            return
+        os.makedirs(job_dir, exist_ok=True)
 
-        for idx, chunk_text in enumerate(chunks_text):
-            db.update_chunk_status(conversion_id, idx, 'processing')
-            
-            filename = f"part_{idx}.wav"
-            part_path = os.path.join(job_dir, filename)
-            
+        for chunk_id, chunk_text in chunks:
             try:
-                provider.synthesize(
-                    text=chunk_text,
-                    output_path=part_path,
-                    voice=speaker,
-                    language=language,
-                    use_cuda=use_cuda
-                )
-                
-                # Calculate duration
-                # Use soundfile used in _concat_wavs or just open
-                info = sf.info(part_path)
-                duration = info.duration
-
-                # Success
-                rel_path = f"{rel_job_dir}/{filename}"
-                db.update_chunk_status(conversion_id, idx, 'done', audio_filename=rel_path, duration=duration)
-                
-            except Exception as e:
-                print(f"Error processing chunk {idx}: {e}")
-                db.update_chunk_status(conversion_id, idx, 'error')
+                _process_chunk(provider_id, provider, conversion_id, chunk_id, chunk_text, speaker, language, use_cuda, job_dir, rel_job_dir)
+            finally:
+                with _QUEUES_LOCK:
+                    _QUEUED_CHUNKS.discard(chunk_id)
 
     except Exception as e:
         print(f"Job failed: {e}")
-        pass
+        with _QUEUES_LOCK:
+            _QUEUED_CHUNKS.difference_update(chunk_id for chunk_id, _ in chunks)
 
 
-def generate_full_audio(conversion_id: str, static_folder: str):
+def edit_conversion_text(conversion_id: str, text: str, static_folder: str, use_cuda: bool = None) -> dict:
     """
-    On-demand full audio generation.
-    Returns relative URL to the full file.
+    Replace the text of a conversion, keeping audio for unchanged sentences.
+    The new chunk list is diffed against the stored one on normalized text;
+    kept chunks are renumbered and only inserted or changed chunks are queued.
     """
-    data = db.get_conversion_with_chunks(conversion_id)
-    if not data:
-        raise ValueError("Conversion not found")
+    if not text.strip():
+        raise ValueError("Text is empty")
+
+    with _work_lock(conversion_id):
+        data = db.get_conversion_with_chunks(conversion_id)
+        if not data:
+            raise ValueError("Conversion not found")
+
+        old_chunks = data["chunks"]
+        new_texts = split_into_chunks(text)
+
+        matcher = difflib.SequenceMatcher(
+            None,
+            [_normalize_chunk_text(c["text"]) for c in old_chunks],
+            [_normalize_chunk_text(t) for t in new_texts],
+            autojunk=False,
+        )
+        kept = {}  # new seq -> old chunk row
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                for offset in range(i2 - i1):
+                    kept[j1 + offset] = old_chunks[i1 + offset]
+
+        rel_job_dir = f"jobs/{conversion_id}"
+        job_dir = os.path.join(static_folder, rel_job_dir)
+        os.makedirs(job_dir, exist_ok=True)
+
+        # Audio of dropped or changed sentences
+        kept_ids = {c["id"] for c in kept.values()}
+        stale_files = [c["audio_filename"] for c in old_chunks if c["id"] not in kept_ids and c["audio_filename"]]
+        for rel in stale_files:
+            path = os.path.join(static_folder, rel)
+            for p in (path, peaks.peaks_path(path)):
+                if os.path.exists(p):
+                    os.remove(p)
+
+        # Keep part_{seq}.wav aligned with the new numbering: move through
+        # temporary names first so shifted files never overwrite each other
+        moves = []
+        for seq, c in kept.items():
+            target = f"{rel_job_dir}/part_{seq}.wav"
+            if c["audio_filename"] and c["audio_filename"] != target:
+                src = os.path.join(static_folder, c["audio_filename"])
+                dst = os.path.join(static_folder, target)
+                tmp = os.path.join(job_dir, f"edit_{c['id']}.wav.tmp")
+                if os.path.exists(src):
+                    os.replace(src, tmp)
+                    moves.append((tmp, dst))
+                if os.path.exists(peaks.peaks_path(src)):
+                    os.replace(peaks.peaks_path(src), tmp + ".peaks")
+                    moves.append((tmp + ".peaks", peaks.peaks_path(dst)))
+                c["audio_filename"] = target
+        for tmp, dst in moves:
+            os.replace(tmp, dst)
+
+        plan = []
+        for seq, chunk_text in enumerate(new_texts):
+            c = kept.get(seq)
+            if c is not None:
+                plan.append({"id": c["id"], "seq_num": seq, "text": c["text"], "audio_filename": c["audio_filename"]})
+            else:
+                plan.append({"id": None, "seq_num": seq, "text": chunk_text})
+
+        estimated_seconds = _estimate_duration(new_texts, data.get("provider", "local"), data.get("speaker"), data.get("language"))
+        db.replace_chunks(conversion_id, text, plan, estimated_duration=estimated_seconds)
+
+        # The flat export no longer matches the chunks
+        full_path = os.path.join(job_dir, _full_audio_filename(data))
+        if os.path.exists(full_path):
+            os.remove(full_path)
+        # Cached conversions are named after the old chunk numbers
+        resampling.clear_cache(job_dir)
+        audiobook_path = os.path.join(job_dir, audiobook.AUDIOBOOK_FILE)
+        if os.path.exists(audiobook_path):
+            os.remove(audiobook_path)
+        with _PEAKS_LOCK:
+            peaks.invalidate_conversion_peaks(job_dir)
+
+    # Chapters whose sentences all survived the edit are reused as encoded
+    _schedule_export(conversion_id, job_dir)
+
+    # Inserted and changed sentences, plus failed or stranded ones no queue entry covers
+    pending = _unqueued(db.get_pending_chunks([conversion_id])[conversion_id])
+    if pending:
+        _enqueue_chunks(
+            conversion_id,
+            pending,
+            speaker=data.get("speaker"),
+            language=data.get("language"),
+            provider=data.get("provider", "local"),
+            use_cuda=_stored_use_cuda(data, use_cuda),
+            static_folder=static_folder,
+            priority=data.get("priority", JOB_PRIORITIES["normal"]),
+        )
+
+    return {
+        "total": len(new_texts),
+        "kept": len(kept),
+        "queued": len(pending),
+        "removed": len(old_chunks) - len(kept),
+    }
+
+
+def live_estimated_duration(data: dict) -> float:
+    """
+    Length of a conversion's timeline in the player: until it is done, the
+    measured durations of finished chunks plus the fitted rate for the rest.
+    `data` as returned by get_conversion_with_chunks.
+    """
+    chunks = data["chunks"]
+    if data["status"] == "done" or not chunks:
+        return data.get("estimated_duration", 0.0)
+    rate = RATE_MODEL.seconds_per_char(data.get("provider", "local"), data.get("speaker"), data.get("language"))
+    return sum(
+        c.get("duration") or 0.0 if c["status"] == "done" else len(c["text"]) * rate
+        for c in chunks
+    )
+
+
+def get_conversion_peaks(conversion_id: str, static_folder: str, width: int = 0):
+    """
+    Waveform peaks of a conversion as interleaved int8 (min, max) pairs,
+    reduced to at most `width` pairs when width > 0. Unfinished chunks are
+    silent and sized by their share of live_estimated_duration, as the
+    player's timeline sizes them; nothing follows the last finished chunk.
+    Returns (peaks, pairs_per_second) or None if the conversion does not exist.
+    """
+    job_dir = os.path.join(static_folder, f"jobs/{conversion_id}")
+    with _PEAKS_LOCK:
+        data = db.get_conversion_with_chunks(conversion_id)
+        if not data:
+            return None
+        chunks = data["chunks"]
+        finished = [i for i, c in enumerate(chunks) if c["status"] == "done" and c["audio_filename"]]
+        if not finished:
+            return np.zeros(0, dtype=np.int8), PEAKS_PER_SECOND
+        total_chars = sum(len(c["text"]) for c in chunks) or 1
+        estimated = live_estimated_duration(data)
+        segments = []
+        for c in chunks[:finished[-1] + 1]:
+            if c["status"] == "done" and c["audio_filename"]:
+                segments.append((os.path.join(static_folder, c["audio_filename"]), c["duration"] or 0.0))
+            else:
+                segments.append((None, estimated * len(c["text"]) / total_chars))
+        # Gaps follow the rate model, which other conversions keep refining,
+        # so only gap-free peaks are cached
+        gaps = len(finished) < len(segments)
+        values = peaks.load_conversion_peaks(job_dir, segments, cache=not gaps)
+
+    rate = PEAKS_PER_SECOND
+    if width > 0 and len(values) // 2 > width:
+        total_pairs = len(values) // 2
+        values = peaks.downsample_peaks(values, width)
+        rate = PEAKS_PER_SECOND * (len(values) // 2) / total_pairs
+    return values, rate
+
+
+def _schedule_export(conversion_id: str, job_dir: str, retitle: bool = False):
+    global _EXPORT_QUEUE
+    if not EXPORT_ENABLED or not audiobook.is_available():
+        return
+    with _QUEUES_LOCK:
+        # A queued build picks up everything finished until it starts
+        if (conversion_id, retitle) in _EXPORT_PENDING:
+            return
+        _EXPORT_PENDING.add((conversion_id, retitle))
+        if _EXPORT_QUEUE is None:
+            import queue
+            _EXPORT_QUEUE = queue.Queue()
+            thread = threading.Thread(target=_export_worker, args=(_EXPORT_QUEUE,), daemon=True)
+            thread.start()
+    _EXPORT_QUEUE.put((conversion_id, job_dir, retitle))
 
-    chunks = data['chunks']
-    if not chunks:
-        raise ValueError("No chunks found")
 
-    # Format: YYYY-MM-DD_{title}.wav
+def _export_worker(export_queue):
+    while True:
+        conversion_id, job_dir, retitle = export_queue.get()
+        with _QUEUES_LOCK:
+            _EXPORT_PENDING.discard((conversion_id, retitle))
+        try:
+            if retitle:
+                audiobook.update_title(conversion_id, job_dir)
+            else:
+                audiobook.build(conversion_id, job_dir)
+        except Exception as e:
+            print(f"[ERROR] Audiobook export of {conversion_id} failed: {e}")
+            db.update_export_status(conversion_id, 'error', 0.0)
+        finally:
+            export_queue.task_done()
+
+
+def export_audiobook(conversion_id: str, static_folder: str) -> bool:
+    """
+    Queue the chaptered audiobook build of a conversion; it also runs by
+    itself as chunks finish. Returns False if export is unavailable.
+    """
+    if not EXPORT_ENABLED or not audiobook.is_available():
+        return False
+    _schedule_export(conversion_id, os.path.join(static_folder, f"jobs/{conversion_id}"))
+    return True
+
+
+def retitle_audiobook(conversion_id: str, static_folder: str):
+    """Carry a new title into the finished audiobook; only its tags are rewritten."""
+    _schedule_export(conversion_id, os.path.join(static_folder, f"jobs/{conversion_id}"), retitle=True)
+
+
+def audiobook_filename(data: dict) -> str:
+    """Download name of the audiobook: YYYY-MM-DD_{title}.m4b"""
+    return os.path.splitext(_full_audio_filename(data))[0] + ".m4b"
+
+
+def _full_audio_filename(data: dict) -> str:
+    """Format: YYYY-MM-DD_{title}.wav"""
     created_at = data.get("created_at", "")
     if not created_at:
         date_str = datetime.now().strftime("%Y-%m-%d")
@@ -236,13 +716,28 @@ def generate_full_audio(conversion_id: str, static_folder: str):
         # created_at is likely "YYYY-MM-DD HH:MM:SS" string from SQLite
         date_str = str(created_at)[:10]
 
-    title = data.get("title", f"conversion_{conversion_id}")
+    title = data.get("title", f"conversion_{data['id']}")
     # Sanitize title
     safe_title = re.sub(r'[^a-zA-Z0-9_\-]', '_', title)
     safe_title = re.sub(r'_+', '_', safe_title).strip('_')
+    return f"{date_str}_{safe_title}.wav"
+
+
+def generate_full_audio(conversion_id: str, static_folder: str):
+    """
+    On-demand full audio generation.
+    Returns relative URL to the full file.
+    """
+    data = db.get_conversion_with_chunks(conversion_id)
+    if not data:
+        raise ValueError("Conversion not found")
+
+    chunks = data['chunks']
+    if not chunks:
+        raise ValueError("No chunks found")
 
     job_dir = os.path.join(static_folder, f"jobs/{conversion_id}")
-    output_filename = f"{date_str}_{safe_title}.wav"
+    output_filename = _full_audio_filename(data)
     final_path = os.path.join(job_dir, output_filename)
 
     # Check if already exists